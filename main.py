@@ -48,7 +48,7 @@ def main():
     mapping = dascot.map(circuit)
 
     routing = dascot.route(mapping)
-    assert routing is not None
+    assert not routing.timed_out
     print(routing)
     with open("out.json", "w") as f:
         jstr = json.dumps(asdict(routing), indent=4)
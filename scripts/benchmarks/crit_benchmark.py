@@ -0,0 +1,68 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from similarity_mapping.dascot.sarouting import (
+    build_crit_dict_fast,
+    build_crit_dict_linear,
+)
+
+GATE_COUNTS = [100, 1000, 10000, 100000, 1000000]
+NUM_QUBITS = 50
+T_GATE_FRACTION = 0.3
+# build_crit_dict_fast is quadratic, so it is only timed up to this size
+FAST_LIMIT = 1000
+
+
+def synthetic_circuit(num_gates: int, rng: np.random.Generator):
+    """
+    Random circuit of CNOTs and T gates on NUM_QUBITS qubits, in the
+    id -> qubits format sim_anneal_route builds.
+    """
+    controls = rng.integers(NUM_QUBITS, size=num_gates)
+    targets = (controls + rng.integers(1, NUM_QUBITS, size=num_gates)) % NUM_QUBITS
+    is_t_gate = rng.random(num_gates) < T_GATE_FRACTION
+    return {
+        i: [c] if t_gate else [c, t]
+        for i, (c, t, t_gate) in enumerate(
+            zip(controls.tolist(), targets.tolist(), is_t_gate.tolist(), strict=True)
+        )
+    }
+
+
+def main():
+    if len(sys.argv) > 2:
+        print("Usage: Optionally expects the path of a csv file to write results to")
+        sys.exit(1)
+    rng = np.random.default_rng(0)
+    rows = []
+    for num_gates in GATE_COUNTS:
+        gates = synthetic_circuit(num_gates, rng)
+        start = time.perf_counter()
+        linear = build_crit_dict_linear(gates)
+        linear_time = time.perf_counter() - start
+        fast_time = None
+        if num_gates <= FAST_LIMIT:
+            start = time.perf_counter()
+            fast = build_crit_dict_fast(gates)
+            fast_time = time.perf_counter() - start
+            assert fast == linear
+        rows.append(
+            {
+                "gates": num_gates,
+                "max_criticality": max(linear.values()),
+                "fast_sec": fast_time,
+                "linear_sec": linear_time,
+                "speedup": fast_time / linear_time if fast_time else None,
+            }
+        )
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    if len(sys.argv) == 2:
+        results.to_csv(sys.argv[1], index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,7 @@ def main():
             continue
         dascot = dascot_connection.Dascot(300, 300)
         circuit = dascot.extract_circuit_from_file(qasm_file_path, arch_type)
+        profile = dascot.profile(circuit.gates)
         # Save useful data per file
         routing_sum = 0
         map_time_sum = 0
@@ -48,13 +49,13 @@ def main():
         for i in range(NUM_MAPPINGS):
             # Map
             start_map = time.perf_counter()
-            mapping = dascot.map(circuit)
+            mapping = dascot.map(circuit, profile=profile)
             map_time_sum += time.perf_counter() - start_map
             # Route
             current_routing_sum = 0
-            for k in range(NUM_ROUTINGS):
-                routing = dascot.route(mapping)
-                if routing is None:
+            for run in dascot.route_many(mapping, NUM_ROUTINGS, profile=profile):
+                routing = run.routing
+                if routing.timed_out:
                     continue
                 routing_sum += len(routing.steps)
                 current_routing_sum += len(routing.steps)
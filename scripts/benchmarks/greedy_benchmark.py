@@ -0,0 +1,98 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from similarity_mapping import dascot_connection
+from similarity_mapping.types import CircuitProfile, Mapping, parse_arch_type
+
+NUM_MAPPINGS = 5
+ROUTING_TIMEOUT_SEC = 300
+
+
+def random_mapping(circuit, rng: random.Random) -> Mapping:
+    qubits = sorted({q for gate in circuit.gates for q in gate})
+    cells = rng.sample(circuit.arch.alg_qubits, len(qubits))
+    return Mapping(
+        map={str(q): c for q, c in zip(qubits, cells, strict=True)},  # type: ignore
+        arch=circuit.arch,
+        gates=circuit.gates,
+    )
+
+
+def timed_route(
+    dascot, mapping: Mapping, profile: CircuitProfile, greedy: bool
+) -> tuple[int, float]:
+    random.seed(0)
+    np.random.seed(0)
+    start = time.perf_counter()
+    routing = dascot.route(mapping, greedy=greedy, profile=profile)
+    return len(routing.steps), time.perf_counter() - start
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print(
+            """Usage: Expects the path to the circuits directory,
+            then the architecture type,
+            then optionally the path of a csv file to write results to"""
+        )
+        sys.exit(1)
+    circuits_directory = sys.argv[1]
+    arch_type = parse_arch_type(sys.argv[2])
+    if arch_type is None:
+        print(
+            "Architecture type must either be: square_sparse_layout or compact_layout"
+        )
+        sys.exit(1)
+    dascot = dascot_connection.Dascot(0, ROUTING_TIMEOUT_SEC)
+    rng = random.Random(0)
+    rows = []
+    # Route the same random mappings of each circuit with both routers
+    for circuit_name in sorted(os.listdir(circuits_directory)):
+        if not circuit_name.endswith(".qasm"):
+            continue
+        circuit = dascot.extract_circuit_from_file(
+            os.path.join(circuits_directory, circuit_name), arch_type
+        )
+        profile = dascot.profile(circuit.gates)
+        full_steps, greedy_steps = [], []
+        full_time = greedy_time = 0.0
+        for _ in range(NUM_MAPPINGS):
+            mapping = random_mapping(circuit, rng)
+            steps, elapsed = timed_route(dascot, mapping, profile, greedy=False)
+            full_steps.append(steps)
+            full_time += elapsed
+            steps, elapsed = timed_route(dascot, mapping, profile, greedy=True)
+            greedy_steps.append(steps)
+            greedy_time += elapsed
+        rows.append(
+            {
+                "circuit": circuit_name,
+                "gates": len(circuit.gates),
+                "full_steps_avg": np.mean(full_steps),
+                "greedy_steps_avg": np.mean(greedy_steps),
+                "steps_ratio": np.sum(greedy_steps) / np.sum(full_steps),
+                # Whether greedy routing picks the mapping the full router prefers
+                "same_best_mapping": int(np.argmin(greedy_steps))
+                == int(np.argmin(full_steps)),
+                "full_sec_avg": full_time / NUM_MAPPINGS,
+                "greedy_sec_avg": greedy_time / NUM_MAPPINGS,
+                "speedup": full_time / greedy_time,
+            }
+        )
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    print(
+        f"\nOverall: {results['steps_ratio'].mean():.3f}x the steps, "
+        f"{results['full_sec_avg'].sum() / results['greedy_sec_avg'].sum():.1f}x faster"
+    )
+    if len(sys.argv) == 4:
+        results.to_csv(sys.argv[3], index=False)
+
+
+if __name__ == "__main__":
+    main()
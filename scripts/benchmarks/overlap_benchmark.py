@@ -0,0 +1,74 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from similarity_mapping.dascot.overlaps import count_overlapping_boxes
+from similarity_mapping.dascot.phased_graph import count_overlapping_fast
+
+EDGE_COUNTS = [10, 50, 100, 500, 1000, 5000]
+REPEATS = 3
+
+
+def synthetic_layer(num_edges: int, rng: np.random.Generator):
+    """
+    One layer of disjoint CNOTs between randomly placed qubits on a square grid.
+    """
+    grid_len = 2 * int(np.ceil(np.sqrt(2 * num_edges))) + 1
+    arch = {
+        "height": grid_len,
+        "width": grid_len,
+        "alg_qubits": [],
+        "magic_states": [],
+    }
+    locations = rng.choice(grid_len * grid_len, size=2 * num_edges, replace=False)
+    mapping = {
+        q: (int(p % grid_len), int(p // grid_len)) for q, p in enumerate(locations)
+    }
+    layer = {q: set() for q in range(2 * num_edges + 1)}
+    for e in range(num_edges):
+        c, t = 2 * e, 2 * e + 1
+        layer[c].add((c, t))
+        layer[t].add((c, t))
+    xy = np.array([mapping[q] for q in range(2 * num_edges)])
+    c_xy, t_xy = xy[0::2], xy[1::2]
+    lo, hi = np.minimum(c_xy, t_xy), np.maximum(c_xy, t_xy)
+    boxes = np.stack((lo[:, 0], hi[:, 0], lo[:, 1], hi[:, 1]), axis=1)
+    return mapping, {0: layer}, arch, boxes
+
+
+def main():
+    if len(sys.argv) > 2:
+        print("Usage: Optionally expects the path of a csv file to write results to")
+        sys.exit(1)
+    rng = np.random.default_rng(0)
+    rows = []
+    for num_edges in EDGE_COUNTS:
+        mapping, phased_graphs, arch, boxes = synthetic_layer(num_edges, rng)
+        pairwise_time = sweep_time = 0.0
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            pairwise = count_overlapping_fast(mapping, phased_graphs, arch)
+            pairwise_time += time.perf_counter() - start
+            start = time.perf_counter()
+            sweep = count_overlapping_boxes(boxes)
+            sweep_time += time.perf_counter() - start
+            assert pairwise == sweep
+        rows.append(
+            {
+                "edges": num_edges,
+                "overlaps": sweep,
+                "pairwise_sec": pairwise_time / REPEATS,
+                "sweep_sec": sweep_time / REPEATS,
+                "speedup": pairwise_time / sweep_time,
+            }
+        )
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    if len(sys.argv) == 2:
+        results.to_csv(sys.argv[1], index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from similarity_mapping.types import (
 )
 from embeddings.semantic_embeddings import SemanticEmbeddingGenerator
 from dataclasses import asdict
+from operator import attrgetter
 
 CONNECTION = ConnectionConfig(
     # host="172.25.208.1",
@@ -22,7 +23,9 @@ CONNECTION = ConnectionConfig(
     password="postgres",
     dbname="postgres",
 )
-NUM_SIMILAR_MAPPINGS = 5
+NUM_SIMILAR_MAPPINGS = 20
+# Soft mappings with the fewest overlaps that get routed
+TOP_K_MAPPINGS = 5
 NUM_ROUTINGS = 5
 
 
@@ -49,6 +52,9 @@ def main():
     best_mappings = []
     route_average = []
     best_map_route_avg = []
+    # Overlaps of every retrieved soft mapping, in retrieval order
+    candidate_overlaps = []
+    best_map_overlaps = []
 
     # Start connection
     device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -62,23 +68,31 @@ def main():
             continue
         dascot = dascot_connection.Dascot(0, 0)
         circuit = dascot.extract_circuit_from_file(qasm_file_path, arch_type)
+        profile = dascot.profile(circuit.gates)
         # Similar mappings
         text_embedding = embedder.generate_embedding_from_circuit(asdict(circuit))
         similar_mappings = db.retrieve_similar(text_embedding, NUM_SIMILAR_MAPPINGS)
+        # Create soft mappings and only route those with the fewest overlaps
+        soft_mappings = [
+            SimilarityMapper(
+                circuit=circuit, similar_mapping=parse_mapping_safe(similar_mapping[0])
+            ).soft_map()
+            for similar_mapping in similar_mappings
+        ]
+        ranked = dascot.rank_mappings(soft_mappings, profile)
+        top_mappings = ranked[:TOP_K_MAPPINGS]
         # Save useful data per file
         routing_sum = 0
         best_routing_avg = len(circuit.gates)
         best_mapping: Mapping | None = None
-        for similar_mapping in similar_mappings:
-            # Create soft mapping
-            similar_mapping = parse_mapping_safe(similar_mapping[0])
-            mapper = SimilarityMapper(circuit=circuit, similar_mapping=similar_mapping)
-            mapping = mapper.soft_map()
+        best_overlaps = 0
+        for scored in top_mappings:
+            mapping = scored.mapping
             # Route
             current_routing_sum = 0
-            for k in range(NUM_ROUTINGS):
-                routing = dascot.route(mapping)
-                if routing is None:
+            for run in dascot.route_many(mapping, NUM_ROUTINGS, profile=profile):
+                routing = run.routing
+                if routing.timed_out:
                     continue
                 routing_sum += len(routing.steps)
                 current_routing_sum += len(routing.steps)
@@ -86,16 +100,25 @@ def main():
             if best_routing_avg >= (current_routing_sum / NUM_ROUTINGS):
                 best_routing_avg = current_routing_sum / NUM_ROUTINGS
                 best_mapping = mapping
+                best_overlaps = scored.overlaps
         # append to data
         assert best_mapping is not None  # Should never fail
         best_mappings.append(json.dumps(best_mapping.map))
-        route_average.append(routing_sum / (NUM_ROUTINGS * NUM_SIMILAR_MAPPINGS))
+        route_average.append(routing_sum / (NUM_ROUTINGS * len(top_mappings)))
         best_map_route_avg.append(best_routing_avg)
+        candidate_overlaps.append(
+            json.dumps(
+                [scored.overlaps for scored in sorted(ranked, key=attrgetter("index"))]
+            )
+        )
+        best_map_overlaps.append(best_overlaps)
 
     # Record data
     benchmark_df["similarity_routing_avg"] = route_average
     benchmark_df["similarity_best_mapping"] = best_mappings
     benchmark_df["similarity_best_mapping_route_avg"] = best_map_route_avg
+    benchmark_df["similarity_candidate_overlaps"] = candidate_overlaps
+    benchmark_df["similarity_best_mapping_overlaps"] = best_map_overlaps
     benchmark_df.to_csv(file_path, index=False)
     db.close_connection()
 
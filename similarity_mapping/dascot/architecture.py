@@ -1,4 +1,8 @@
 import math
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+
+import numpy as np
 
 
 def insert_row_above(arch):
@@ -24,10 +28,10 @@ def insert_column_left(arch):
         # need to count first row
         row = q // arch["width"] + 1
         new["alg_qubits"].append(q + row)
-    for m in arch["alg_qubits"]:
+    for m in arch["magic_states"]:
         # need to count first row
         row = m // arch["width"] + 1
-        new["magic_states"].append(q + row)  # type: ignore
+        new["magic_states"].append(m + row)
     return new
 
 
@@ -40,10 +44,10 @@ def insert_column_right(arch):
         # now don't coount the one in my row
         row = q // arch["width"]
         new["alg_qubits"].append(q + row)
-    for m in arch["alg_qubits"]:
+    for m in arch["magic_states"]:
         # don't coujnt my row
         row = m // arch["width"]
-        new["magic_states"].append(q + row)  # type: ignore
+        new["magic_states"].append(m + row)
     return new
 
 
@@ -156,3 +160,203 @@ def horizontal_neighbors(n, grid_len, grid_height, omitted_edges):
     ):
         neighbors.append(right)
     return neighbors
+
+
+# Distance reported when no route exists
+UNREACHABLE = 2**31 - 1
+
+
+@dataclass(frozen=True, eq=False)
+class ArchitectureGeometry:
+    """
+    Precomputed, read-only geometry of an architecture.
+    Cells are numbered row-major, so cell n is at (xs[n], ys[n]) =
+    (n % width, n // width). The up/down/left/right tables hold the
+    neighbouring cell in that direction, or -1 on the edge of the grid.
+    Get instances from geometry_for_arch, which memoises them.
+    """
+
+    width: int
+    height: int
+    alg_qubits: tuple[int, ...]
+    magic_states: tuple[int, ...]
+    xs: np.ndarray
+    ys: np.ndarray
+    up: np.ndarray
+    down: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+
+    @classmethod
+    def from_arch(cls, arch: dict) -> "ArchitectureGeometry":
+        width, height = arch["width"], arch["height"]
+        cells = np.arange(width * height, dtype=np.int64)
+        xs, ys = cells % width, cells // width
+        tables = {
+            "xs": xs,
+            "ys": ys,
+            "up": np.where(ys > 0, cells - width, -1),
+            "down": np.where(ys < height - 1, cells + width, -1),
+            "left": np.where(xs > 0, cells - 1, -1),
+            "right": np.where(xs < width - 1, cells + 1, -1),
+        }
+        for table in tables.values():
+            table.setflags(write=False)
+        return cls(
+            width=width,
+            height=height,
+            alg_qubits=tuple(arch["alg_qubits"]),
+            magic_states=tuple(arch["magic_states"]),
+            **tables,
+        )
+
+    @property
+    def num_cells(self) -> int:
+        return self.width * self.height
+
+    @cached_property
+    def magic_states_by_distance(self) -> np.ndarray:
+        """
+        Row n lists the magic states sorted by Manhattan distance from cell n.
+        Ties keep the order of the architecture's magic state list.
+        """
+        magic_states = np.array(self.magic_states, dtype=np.int64)
+        distances = np.abs(self.xs[:, None] - self.xs[magic_states][None, :]) + np.abs(
+            self.ys[:, None] - self.ys[magic_states][None, :]
+        )
+        table = magic_states[np.argsort(distances, axis=1, kind="stable")]
+        table.setflags(write=False)
+        return table
+
+    @cached_property
+    def nearest_magic_state(self) -> np.ndarray:
+        """
+        Closest magic state to every cell, ties going to the one listed first.
+        Raises ValueError if the architecture has no magic states.
+        """
+        if len(self.magic_states) == 0:
+            raise ValueError("The architecture has no magic states")
+        table = self.magic_states_by_distance[:, 0].copy()
+        table.setflags(write=False)
+        return table
+
+    @cached_property
+    def nearest_magic_state_xy(self) -> np.ndarray:
+        """
+        (x, y) of the closest magic state to every cell.
+        Raises ValueError if the architecture has no magic states.
+        """
+        nearest = self.nearest_magic_state
+        table = np.stack((self.xs[nearest], self.ys[nearest]), axis=1)
+        table.setflags(write=False)
+        return table
+
+    @cached_property
+    def nearest_magic_state_distance(self) -> np.ndarray:
+        """
+        Manhattan distance from every cell to its closest magic state,
+        0 if the architecture has no magic states.
+        """
+        if len(self.magic_states) == 0:
+            table = np.zeros(self.num_cells, dtype=np.int64)
+        else:
+            nearest = self.nearest_magic_state
+            table = np.abs(self.xs - self.xs[nearest]) + np.abs(
+                self.ys - self.ys[nearest]
+            )
+        table.setflags(write=False)
+        return table
+
+    @cached_property
+    def t_port_distance(self) -> np.ndarray:
+        """
+        Unobstructed length of the shortest T gate route from every cell: the
+        Manhattan distance between the closest vertical port of the cell and
+        horizontal port of a magic state, or UNREACHABLE if there is none.
+        """
+        magic_states = np.array(self.magic_states, dtype=np.int64)
+        sources = np.stack((self.up, self.down), axis=1)
+        targets = np.concatenate(
+            (self.left[magic_states], self.right[magic_states])
+        )
+        dx = self.xs[sources][:, :, None] - self.xs[targets][None, None, :]
+        dy = self.ys[sources][:, :, None] - self.ys[targets][None, None, :]
+        distances = np.abs(dx) + np.abs(dy)
+        valid = (sources >= 0)[:, :, None] & (targets >= 0)[None, None, :]
+        distances = np.where(valid, distances, UNREACHABLE)
+        table = distances.reshape(self.num_cells, -1).min(
+            axis=1, initial=UNREACHABLE
+        )
+        table.setflags(write=False)
+        return table
+
+    def cnot_port_distance(self, control: int, target: int) -> int:
+        """
+        Unobstructed length of the shortest CNOT route between two cells:
+        the Manhattan distance between the closest vertical port of `control`
+        and horizontal port of `target`, or UNREACHABLE if there is none.
+        """
+        return min(
+            (
+                self.distance(vn, hn)
+                for vn in self.vertical_neighbors(control)
+                for hn in self.horizontal_neighbors(target)
+            ),
+            default=UNREACHABLE,
+        )
+
+    def coords(self, cell: int) -> tuple[int, int]:
+        return int(self.xs[cell]), int(self.ys[cell])
+
+    def cell(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def distance(self, cell1: int, cell2: int) -> int:
+        return abs(int(self.xs[cell1]) - int(self.xs[cell2])) + abs(
+            int(self.ys[cell1]) - int(self.ys[cell2])
+        )
+
+    def vertical_neighbors(self, n: int) -> list[int]:
+        """
+        Same as `vertical_neighbors(n, width, height, omitted_edges=[])`.
+        """
+        return [int(v) for v in (self.up[n], self.down[n]) if v >= 0]
+
+    def horizontal_neighbors(self, n: int) -> list[int]:
+        """
+        Same as `horizontal_neighbors(n, width, height, omitted_edges=[])`.
+        """
+        return [int(h) for h in (self.left[n], self.right[n]) if h >= 0]
+
+
+# Architectures whose geometry stays memoised, least recently used first out
+GEOMETRY_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def _geometry(
+    width: int, height: int, alg_qubits: tuple[int, ...], magic_states: tuple[int, ...]
+) -> ArchitectureGeometry:
+    return ArchitectureGeometry.from_arch(
+        {
+            "width": width,
+            "height": height,
+            "alg_qubits": alg_qubits,
+            "magic_states": magic_states,
+        }
+    )
+
+
+def geometry_for_arch(arch) -> ArchitectureGeometry:
+    """
+    Memoised geometry of an architecture dict (or any object with the same
+    fields, like types.Architecture).
+    """
+    if not isinstance(arch, dict):
+        arch = vars(arch)
+    return _geometry(
+        arch["width"],
+        arch["height"],
+        tuple(arch["alg_qubits"]),
+        tuple(arch["magic_states"]),
+    )
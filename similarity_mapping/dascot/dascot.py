@@ -1,19 +1,9 @@
 import json
 import re
+from .layering import circuit_depth
 from .phased_graph import build_phased_map
 from .sarouting import sim_anneal_route
-import signal
-
-
-class TimeoutException(Exception):
-    """Custom exception to handle routing timeout."""
-
-    pass
-
-
-def timeout_handler(signum, frame):
-    """Signal handler for routing timeout."""
-    raise TimeoutException("Routing timed out")
+from .deadline import Deadline
 
 
 def extract_gates_from_file(fname):
@@ -63,9 +53,9 @@ def labeled_gate_path(id_to_op, id, args, path):
     return dict
 
 
-def run_dascot(circ, gates, arch, output_path, timeout):
+def run_dascot(gates, arch, output_path, timeout):
     sim_anneal_params = [100, 0.1, 0.1]
-    depth = circ.depth(filter_function=lambda x: x[0].name in ["cx", "t", "tdg"])
+    depth = circuit_depth(gates)
     scaled_sim_anneal_params = [
         sim_anneal_params[0],
         sim_anneal_params[1] / depth,
@@ -73,31 +63,25 @@ def run_dascot(circ, gates, arch, output_path, timeout):
     ]
     phased_map, _ = build_phased_map(
         extract_qubits_from_gates(gates),
-        circ,
+        gates,
         arch,
         include_t=True,
         timeout=timeout // 2,
         *scaled_sim_anneal_params,
     )
 
-    signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(timeout // 2)
-
-    try:
-        steps, _ = sim_anneal_route(
-            gates,
-            arch,
-            phased_map,
-            reward_name="criticality",
-            order_fraction=1,
-            take_first_ms=False,
-            *[10, 0.1, 0.1],
-        )
-    except TimeoutException:
+    steps, _ = sim_anneal_route(
+        gates,
+        arch,
+        phased_map,
+        reward_name="criticality",
+        order_fraction=1,
+        take_first_ms=False,
+        deadline=Deadline(timeout // 2),
+        *[10, 0.1, 0.1],
+    )
+    if sum(len(step) for step in steps) < len(gates):
         print("Routing timed out. Writing partial output...")
         with open(output_path, "w") as f:
-            json.dump({"map": phased_map, "steps": "timeout"}, f)
-        return
-    finally:
-        signal.alarm(0)
+            json.dump({"map": phased_map, "steps": steps, "timed_out": True}, f)
     return phased_map, steps
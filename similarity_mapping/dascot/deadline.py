@@ -0,0 +1,26 @@
+import math
+import time
+
+
+class Deadline:
+    """
+    Time after which the annealers and the router stop and return the best
+    result found so far. Loops check it themselves, so unlike a SIGALRM
+    timeout it works in any thread or worker process. A deadline without
+    positive `seconds` never expires, as `signal.alarm(0)` sets no alarm.
+
+    Uses the monotonic clock, which worker processes on the same machine
+    share, so a deadline can be sent to them.
+    """
+
+    def __init__(self, seconds: float | None = None) -> None:
+        if seconds is None or seconds <= 0:
+            self.expires_at = math.inf
+        else:
+            self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
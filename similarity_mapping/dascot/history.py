@@ -0,0 +1,115 @@
+import os
+import struct
+from collections.abc import Iterator
+
+import numpy as np
+
+
+class MappingHistory:
+    """
+    Record of the mappings visited by an annealing chain, one row per step.
+
+    Rows live in a preallocated structured array with an int16 `positions`
+    column (the flat position of each qubit of `qubits`, in that order) and
+    an int32 `cost` column. With a `path` the array is a memory-mapped .npy
+    file. Either way the array doubles when it runs out of rows.
+    """
+
+    def __init__(
+        self, qubits: list[int], capacity: int, path: str | os.PathLike | None = None
+    ) -> None:
+        self.qubits = list(qubits)
+        self.path = path
+        self.size = 0
+        self.dtype = np.dtype(
+            [("positions", np.int16, (len(self.qubits),)), ("cost", np.int32)]
+        )
+        capacity = max(capacity, 1)
+        if path is None:
+            self.records = np.empty(capacity, dtype=self.dtype)
+        else:
+            self.records = np.lib.format.open_memmap(
+                path, mode="w+", dtype=self.dtype, shape=(capacity,), version=(1, 0)
+            )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[tuple[list[tuple[int, int]], int]]:
+        return self.rows()
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.records["positions"][: self.size]
+
+    @property
+    def costs(self) -> np.ndarray:
+        return self.records["cost"][: self.size]
+
+    def _reserve(self, rows: int) -> None:
+        needed = self.size + rows
+        if needed <= len(self.records):
+            return
+        capacity = max(needed, 2 * len(self.records))
+        if self.path is not None:
+            self._resize_file(capacity, mode="r+")
+            return
+        grown = np.empty(capacity, dtype=self.dtype)
+        grown[: self.size] = self.records[: self.size]
+        self.records = grown
+
+    def _resize_file(self, rows: int, mode: str) -> None:
+        """
+        Rewrites the .npy header for `rows` rows and resizes the file to match.
+        numpy pads headers so the row count can grow without moving the data.
+        """
+        self.records.flush()
+        offset = self.records.offset
+        del self.records
+        header = repr(
+            {
+                "descr": np.lib.format.dtype_to_descr(self.dtype),
+                "fortran_order": False,
+                "shape": (rows,),
+            }
+        )
+        magic = np.lib.format.magic(1, 0)
+        header_len = offset - len(magic) - 2
+        if len(header) >= header_len:
+            raise ValueError(f"History file {self.path} cannot grow to {rows} rows")
+        with open(self.path, "r+b") as f:
+            f.write(magic + struct.pack("<H", header_len))
+            f.write((header.ljust(header_len - 1) + "\n").encode("latin1"))
+            f.truncate(offset + rows * self.dtype.itemsize)
+        if rows == 0:
+            # Empty files cannot be memory-mapped
+            self.records = np.load(self.path)
+        else:
+            self.records = np.load(self.path, mmap_mode=mode)
+
+    def extend(self, positions: np.ndarray, costs: np.ndarray) -> None:
+        """
+        Appends one row per entry of `costs`.
+        """
+        self._reserve(len(costs))
+        rows = self.records[self.size : self.size + len(costs)]
+        rows["positions"] = positions
+        rows["cost"] = costs
+        self.size += len(costs)
+
+    def rows(self) -> Iterator[tuple[list[tuple[int, int]], int]]:
+        """
+        Yields each step as ([(qubit, position), ...], cost), the format
+        build_phased_map returns mappings in.
+        """
+        for positions, cost in self.records[: self.size]:
+            yield list(zip(self.qubits, positions.tolist(), strict=True)), int(cost)
+
+    def close(self) -> None:
+        """
+        Flushes a file-backed history and shrinks the .npy file to the rows
+        actually written. The history stays readable afterwards.
+        """
+        if self.path is None or not isinstance(self.records, np.memmap):
+            return
+        self._resize_file(self.size, mode="r")
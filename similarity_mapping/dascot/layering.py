@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CompactPhasedGraph:
+    """
+    Phased connectivity graphs stored as flat int32 edge arrays.
+    Edges are sorted by layer and the edges of layer i are
+    `layer_offsets[i]:layer_offsets[i + 1]`, so memory scales with the
+    number of gates instead of depth x qubits. T gates are edges from their
+    qubit to the `num_qubits` sentinel.
+    """
+
+    layer_offsets: np.ndarray
+    layers: np.ndarray
+    controls: np.ndarray
+    targets: np.ndarray
+    num_qubits: int
+
+    @property
+    def num_layers(self) -> int:
+        return len(self.layer_offsets) - 1
+
+    def layer_edges(self, layer: int) -> list[tuple[int, int]]:
+        start, end = self.layer_offsets[layer], self.layer_offsets[layer + 1]
+        return list(
+            zip(
+                self.controls[start:end].tolist(),
+                self.targets[start:end].tolist(),
+                strict=True,
+            )
+        )
+
+    @classmethod
+    def from_edges(
+        cls,
+        layers: list[int],
+        controls: list[int],
+        targets: list[int],
+        num_qubits: int,
+        num_layers: int,
+    ) -> "CompactPhasedGraph":
+        layers_array = np.array(layers, dtype=np.int32)
+        order = np.argsort(layers_array, kind="stable")
+        layer_offsets = np.zeros(num_layers + 1, dtype=np.int32)
+        np.cumsum(
+            np.bincount(layers_array, minlength=num_layers), out=layer_offsets[1:]
+        )
+        return cls(
+            layer_offsets=layer_offsets,
+            layers=layers_array[order],
+            controls=np.array(controls, dtype=np.int32)[order],
+            targets=np.array(targets, dtype=np.int32)[order],
+            num_qubits=num_qubits,
+        )
+
+
+def as_compact_phased_graph(phased_graphs) -> CompactPhasedGraph:
+    """
+    Converts the dict of per-layer edge sets built by
+    `build_phased_connectivity_graph_fast` into a CompactPhasedGraph.
+    Compact graphs are returned unchanged.
+    """
+    if isinstance(phased_graphs, CompactPhasedGraph):
+        return phased_graphs
+    layers, controls, targets = [], [], []
+    num_qubits = 0
+    for layer, g in enumerate(phased_graphs.values()):
+        num_qubits = len(g) - 1
+        for c, t in {x for edges in g.values() for x in edges}:
+            layers.append(layer)
+            controls.append(c)
+            targets.append(t)
+    return CompactPhasedGraph.from_edges(
+        layers, controls, targets, num_qubits, len(phased_graphs)
+    )
+
+
+def gate_layers(gates: list[list[int]]) -> list[int]:
+    """
+    Assigns every gate to its ASAP layer in a single pass over the gates.
+    A gate sits one layer after the latest gate on any of its qubits, which
+    matches the layers qiskit's DAG produces for a circuit of cx and t gates.
+    """
+    next_free: dict[int, int] = {}
+    layers = []
+    for gate in gates:
+        layer = max(next_free.get(q, 0) for q in gate)
+        for q in gate:
+            next_free[q] = layer + 1
+        layers.append(layer)
+    return layers
+
+
+def circuit_depth(gates: list[list[int]]) -> int:
+    """
+    Depth of the circuit counting cx, t and tdg gates.
+    Equivalent to `qcircuit.depth(filter_function=...)` on `qasm_from_gates`.
+    """
+    return max(gate_layers(gates), default=-1) + 1
+
+
+def build_phased_connectivity_graph_from_gates(
+    gates: list[list[int]], num_qubits: int, include_t=True
+) -> dict[int, dict[int, set]]:
+    """
+    Builds the same phased connectivity graphs as
+    `build_phased_connectivity_graph_fast` straight from a gate list.
+    T gates are edges from their qubit to the `num_qubits` sentinel.
+    """
+    layers = gate_layers(gates)
+    phased_graphs = {
+        i: {q: set() for q in range(num_qubits + 1)}
+        for i in range(max(layers, default=-1) + 1)
+    }
+    for gate, layer in zip(gates, layers, strict=True):
+        graph = phased_graphs[layer]
+        if len(gate) == 2:
+            c, t = gate
+            graph[c].add((c, t))
+            graph[t].add((c, t))
+        elif include_t:
+            q = gate[0]
+            graph[q].add((q, num_qubits))
+    return phased_graphs
+
+
+def build_compact_phased_graph(
+    gates: list[list[int]], num_qubits: int, include_t=True
+) -> CompactPhasedGraph:
+    """
+    Builds the phased connectivity graphs of a gate list as a
+    CompactPhasedGraph in a single pass.
+    """
+    gates_layers = gate_layers(gates)
+    layers, controls, targets = [], [], []
+    for gate, layer in zip(gates, gates_layers, strict=True):
+        if len(gate) == 2:
+            layers.append(layer)
+            controls.append(gate[0])
+            targets.append(gate[1])
+        elif include_t:
+            layers.append(layer)
+            controls.append(gate[0])
+            targets.append(num_qubits)
+    return CompactPhasedGraph.from_edges(
+        layers, controls, targets, num_qubits, max(gates_layers, default=-1) + 1
+    )
@@ -0,0 +1,280 @@
+import threading
+from collections import deque
+from functools import lru_cache
+
+from .architecture import GEOMETRY_CACHE_SIZE, ArchitectureGeometry
+
+
+class MaskedGrid:
+    """
+    Routing grid of an architecture with blocked cells kept in a reusable
+    bytearray mask, replacing a rustworkx grid graph with nodes removed.
+
+    Paths are identical to `rx.dijkstra_shortest_paths` on that graph:
+    neighbours are visited in the order the grid graph iterates its edges
+    (right, down, left, up) and the priority queue reproduces the
+    tie-breaking of Rust's BinaryHeap. Search buffers are preallocated and
+    only the cells a search touched are reset afterwards.
+
+    The mask and buffers belong to one routing at a time, while the
+    neighbour tables are shared by every grid of the architecture.
+    """
+
+    def __init__(self, geometry: ArchitectureGeometry) -> None:
+        self.geometry = geometry
+        self.neighbors, self.vertical, self.horizontal, self._t_gate_targets = (
+            _grid_tables(geometry)
+        )
+        self.blocked = bytearray(geometry.num_cells)
+        self._distance = [-1] * geometry.num_cells
+        self._parent = [-1] * geometry.num_cells
+        self._label = [-1] * geometry.num_cells
+
+    def t_gate_targets(self, cell: int) -> dict[int, tuple[int, int]]:
+        """
+        End cells of a T gate on a qubit cell, keyed to (rank of the magic
+        state by distance from the cell, position next to that magic state).
+        A cell next to several magic states keeps its nearest one.
+        Computed once per cell.
+        """
+        targets = self._t_gate_targets.get(cell)
+        if targets is None:
+            targets = {}
+            magic_states = self.geometry.magic_states_by_distance[cell].tolist()
+            for rank, magic_state in enumerate(magic_states):
+                for position, hn in enumerate(self.horizontal[magic_state]):
+                    targets.setdefault(hn, (rank, position))
+            self._t_gate_targets[cell] = targets
+        return targets
+
+    def reset(self, blocked_cells) -> None:
+        """
+        Unblocks every cell, then blocks `blocked_cells`.
+        """
+        self.blocked[:] = bytes(len(self.blocked))
+        for cell in blocked_cells:
+            self.blocked[cell] = 1
+
+    def block(self, cells) -> None:
+        for cell in cells:
+            self.blocked[cell] = 1
+
+    def is_free(self, cell: int) -> bool:
+        return not self.blocked[cell]
+
+    def distances(self, source: int, targets) -> dict[int, int]:
+        """
+        BFS distances from `source` to each reachable cell of `targets`.
+        Stops as soon as all targets are found.
+        """
+        distance = self._distance
+        neighbors = self.neighbors
+        blocked = self.blocked
+        remaining = set(targets)
+        found = {}
+        distance[source] = 0
+        touched = [source]
+        queue = deque([source])
+        if source in remaining:
+            found[source] = 0
+            remaining.discard(source)
+        while queue and remaining:
+            node = queue.popleft()
+            next_distance = distance[node] + 1
+            for next_node in neighbors[node]:
+                if blocked[next_node] or distance[next_node] >= 0:
+                    continue
+                distance[next_node] = next_distance
+                touched.append(next_node)
+                queue.append(next_node)
+                if next_node in remaining:
+                    found[next_node] = next_distance
+                    remaining.discard(next_node)
+        for node in touched:
+            distance[node] = -1
+        return found
+
+    def search(
+        self, sources: list[int], targets, exhaustive: bool = False
+    ) -> dict[int, tuple[int, int]]:
+        """
+        One BFS from all `sources` at once. Returns the reached cells of
+        `targets` mapped to (distance, source rank), where the rank is the
+        source's index in `sources`.
+
+        Sources are queued in rank order, so every level of the BFS stays
+        sorted by rank and each cell is labelled with the lowest-ranked source
+        among those at its distance. By default the search stops after the
+        first level that reaches a target. With `exhaustive` it floods the
+        whole reachable area instead and each target gets the lowest rank of
+        any source connected to it, merging labels where their areas meet.
+        """
+        label = self._label
+        neighbors = self.neighbors
+        blocked = self.blocked
+        merged = list(range(len(sources)))
+
+        def root(rank: int) -> int:
+            while merged[rank] != rank:
+                rank = merged[rank]
+            return rank
+
+        found: dict[int, tuple[int, int]] = {}
+        frontier = []
+        for rank, source in enumerate(sources):
+            label[source] = rank
+            frontier.append(source)
+            if source in targets:
+                found[source] = (0, rank)
+        touched = list(frontier)
+        distance = 0
+        while frontier and (exhaustive or not found):
+            distance += 1
+            next_frontier = []
+            for node in frontier:
+                node_label = label[node]
+                for next_node in neighbors[node]:
+                    if blocked[next_node]:
+                        continue
+                    next_label = label[next_node]
+                    if next_label >= 0:
+                        if exhaustive and next_label != node_label:
+                            low, high = sorted((root(next_label), root(node_label)))
+                            merged[high] = low
+                        continue
+                    label[next_node] = node_label
+                    next_frontier.append(next_node)
+                    if next_node in targets:
+                        found[next_node] = (distance, node_label)
+            touched.extend(next_frontier)
+            frontier = next_frontier
+        for node in touched:
+            label[node] = -1
+        if exhaustive:
+            found = {t: (d, root(rank)) for t, (d, rank) in found.items()}
+        return found
+
+    def path(self, source: int, target: int) -> list[int] | None:
+        """
+        The path rustworkx's Dijkstra returns from `source` to `target`
+        (both included), or None if the target is unreachable.
+
+        With unit weights every cell is pushed once and keeps the parent that
+        discovered it, so the search stops when `target` is discovered. The
+        heap below follows Rust's BinaryHeap push/pop exactly, since the pop
+        order among equal scores decides which parent that is.
+        """
+        if source == target:
+            return [source]
+        score = self._distance
+        parent = self._parent
+        neighbors = self.neighbors
+        blocked = self.blocked
+        heap = [source]
+        score[source] = 0
+        touched = [source]
+        reached = False
+        while heap and not reached:
+            node = _heap_pop(heap, score)
+            next_score = score[node] + 1
+            for next_node in neighbors[node]:
+                if blocked[next_node] or score[next_node] >= 0:
+                    continue
+                score[next_node] = next_score
+                parent[next_node] = node
+                touched.append(next_node)
+                if next_node == target:
+                    reached = True
+                    break
+                _heap_push(heap, score, next_node)
+        path = None
+        if reached:
+            path = [target]
+            while path[-1] != source:
+                path.append(parent[path[-1]])
+            path.reverse()
+        for node in touched:
+            score[node] = -1
+            parent[node] = -1
+        return path
+
+
+def _heap_sift_up(heap: list[int], score: list[int], start: int, pos: int) -> None:
+    # A min-heap entry moves above its parent only on a strictly lower score
+    element = heap[pos]
+    while pos > start:
+        parent = (pos - 1) // 2
+        if score[element] >= score[heap[parent]]:
+            break
+        heap[pos] = heap[parent]
+        pos = parent
+    heap[pos] = element
+
+
+def _heap_push(heap: list[int], score: list[int], node: int) -> None:
+    heap.append(node)
+    _heap_sift_up(heap, score, 0, len(heap) - 1)
+
+
+def _heap_pop(heap: list[int], score: list[int]) -> int:
+    # BinaryHeap::pop: move the last entry to the root, sift it down to the
+    # bottom preferring the right child on ties, then sift it back up
+    item = heap.pop()
+    if not heap:
+        return item
+    item, heap[0] = heap[0], item
+    end = len(heap)
+    element = heap[0]
+    pos = 0
+    child = 1
+    while child <= end - 2:
+        child += score[heap[child]] >= score[heap[child + 1]]
+        heap[pos] = heap[child]
+        pos = child
+        child = 2 * pos + 1
+    if child == end - 1:
+        heap[pos] = heap[child]
+        pos = child
+    heap[pos] = element
+    _heap_sift_up(heap, score, 0, pos)
+    return item
+
+
+@lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def _grid_tables(geometry: ArchitectureGeometry) -> tuple:
+    """
+    Read-only neighbour tables of an architecture, and the memo of its T
+    gate targets, whose entries never change once computed.
+    """
+    neighbors = [
+        tuple(int(v) for v in cell if v >= 0)
+        for cell in zip(
+            geometry.right, geometry.down, geometry.left, geometry.up, strict=True
+        )
+    ]
+    vertical = [geometry.vertical_neighbors(cell) for cell in range(geometry.num_cells)]
+    horizontal = [
+        geometry.horizontal_neighbors(cell) for cell in range(geometry.num_cells)
+    ]
+    t_gate_targets: dict[int, dict[int, tuple[int, int]]] = {}
+    return neighbors, vertical, horizontal, t_gate_targets
+
+
+_thread_grids = threading.local()
+
+
+def masked_grid_for(geometry: ArchitectureGeometry) -> MaskedGrid:
+    """
+    The routing grid of an architecture for the calling thread. Threads
+    routing at the same time each get their own mask and search buffers.
+    """
+    grids = getattr(_thread_grids, "grids", None)
+    if grids is None:
+        grids = _thread_grids.grids = {}
+    grid = grids.get(geometry)
+    if grid is None:
+        if len(grids) >= GEOMETRY_CACHE_SIZE:
+            # Drop the grid built first, as geometries drop out of their cache
+            del grids[next(iter(grids))]
+        grid = grids[geometry] = MaskedGrid(geometry)
+    return grid
@@ -0,0 +1,337 @@
+import numpy as np
+
+from .architecture import geometry_for_arch
+from .layering import as_compact_phased_graph
+
+
+def _fenwick_add(tree: list[int], i: int, value: int) -> None:
+    while i < len(tree):
+        tree[i] += value
+        i += i & -i
+
+
+def _fenwick_sum(tree: list[int], i: int) -> int:
+    total = 0
+    while i > 0:
+        total += tree[i]
+        i -= i & -i
+    return total
+
+
+def count_overlapping_boxes(boxes: np.ndarray) -> int:
+    """
+    Counts the pairs of overlapping boxes in O(E log E) with a sweep line.
+    Boxes are rows of (xmin, xmax, ymin, ymax) and are closed, so boxes that
+    only touch on an edge or corner overlap, as in `overlapping()`.
+
+    The sweep moves along x, opening a box at xmin and closing it after
+    xmax. Each opened box overlaps every open box except those entirely
+    below or entirely above it in y, which two Fenwick trees over the
+    compressed y coordinates count in O(log E).
+    """
+    n = len(boxes)
+    if n < 2:
+        return 0
+    xmin, xmax, ymin, ymax = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    ys = np.unique(np.concatenate((ymin, ymax)))
+    ymin_rank = (np.searchsorted(ys, ymin) + 1).tolist()
+    ymax_rank = (np.searchsorted(ys, ymax) + 1).tolist()
+    # Openings sort before closings at the same x so touching boxes count
+    closing = np.repeat([0, 1], n)
+    events = np.lexsort((closing, np.concatenate((xmin, xmax))))
+    open_ymax = [0] * (len(ys) + 1)
+    open_ymin = [0] * (len(ys) + 1)
+    open_count = 0
+    overlaps = 0
+    for event in events.tolist():
+        if event < n:
+            below = _fenwick_sum(open_ymax, ymin_rank[event] - 1)
+            above = open_count - _fenwick_sum(open_ymin, ymax_rank[event])
+            overlaps += open_count - below - above
+            _fenwick_add(open_ymax, ymax_rank[event], 1)
+            _fenwick_add(open_ymin, ymin_rank[event], 1)
+            open_count += 1
+        else:
+            closed = event - n
+            _fenwick_add(open_ymax, ymax_rank[closed], -1)
+            _fenwick_add(open_ymin, ymin_rank[closed], -1)
+            open_count -= 1
+    return overlaps
+
+
+# Mapping/pair combinations compared per vectorised block of the batch count
+BATCH_PAIR_BLOCK = 1 << 20
+
+
+def _same_layer_pairs(layer_offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every pair of distinct edges in the same layer, as two index arrays.
+    Layers of equal size share one triangle of offsets.
+    """
+    starts = layer_offsets[:-1].astype(np.int64)
+    sizes = np.diff(layer_offsets).astype(np.int64)
+    firsts, seconds = [], []
+    for size in np.unique(sizes[sizes > 1]).tolist():
+        first, second = np.triu_indices(size, 1)
+        size_starts = starts[sizes == size][:, None]
+        firsts.append((size_starts + first).ravel())
+        seconds.append((size_starts + second).ravel())
+    if not firsts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def count_overlaps_batch(cells, phased_graphs, arch: dict) -> np.ndarray:
+    """
+    Overlap counts of a batch of mappings of the same circuit, each equal to
+    the count an OverlapEngine starts from, in one vectorised pass.
+
+    `cells` has one row per mapping giving the cell of every qubit of the
+    phased graphs. The edge boxes of all mappings are built at once and
+    every pair of edges in the same layer is compared across the batch.
+    """
+    geometry = geometry_for_arch(arch)
+    graph = as_compact_phased_graph(phased_graphs)
+    cells = np.atleast_2d(np.asarray(cells, dtype=np.int64))
+    controls = graph.controls.astype(np.int64)
+    targets = graph.targets.astype(np.int64)
+    # T gates point at the sentinel qubit and end at the nearest magic state
+    is_t_gate = targets == graph.num_qubits
+    control_cells = cells[:, controls]
+    target_cells = cells[:, np.where(is_t_gate, controls, targets)]
+    if is_t_gate.any():
+        target_cells[:, is_t_gate] = geometry.nearest_magic_state[
+            control_cells[:, is_t_gate]
+        ]
+    xs = (geometry.xs[control_cells], geometry.xs[target_cells])
+    ys = (geometry.ys[control_cells], geometry.ys[target_cells])
+    xmin, xmax = np.minimum(*xs), np.maximum(*xs)
+    ymin, ymax = np.minimum(*ys), np.maximum(*ys)
+
+    first, second = _same_layer_pairs(graph.layer_offsets)
+    counts = np.zeros(len(cells), dtype=np.int64)
+    block = max(1, BATCH_PAIR_BLOCK // max(1, len(cells)))
+    for start in range(0, len(first), block):
+        i, j = first[start : start + block], second[start : start + block]
+        apart = (
+            (xmax[:, i] < xmin[:, j])
+            | (xmax[:, j] < xmin[:, i])
+            | (ymax[:, i] < ymin[:, j])
+            | (ymax[:, j] < ymin[:, i])
+        )
+        counts += len(i) - apart.sum(axis=1)
+    return counts
+
+
+class OverlapEngine:
+    """
+    Stateful bounding-box overlap counter used by the mapping annealer.
+
+    Every edge of the phased graphs (a CompactPhasedGraph, or the dict of
+    per-layer edge sets which is converted) is kept in NumPy arrays holding its
+    layer slice and bounding box (xmin, xmax, ymin, ymax). Edges are indexed
+    by qubit so a candidate swap only recomputes the boxes touching the two
+    swapped qubits and compares them against the edges of their own layers.
+    swap_deltas scores a block of candidates at once and apply_swap applies
+    one of them in O(affected edges).
+    """
+
+    def __init__(self, mapping: dict, phased_graphs, arch: dict) -> None:
+        geometry = geometry_for_arch(arch)
+        self.width = geometry.width
+
+        graph = as_compact_phased_graph(phased_graphs)
+        self.controls = graph.controls.astype(np.int64)
+        self.targets = graph.targets.astype(np.int64)
+        self.layer_start = graph.layer_offsets[graph.layers].astype(np.int64)
+        self.layer_end = graph.layer_offsets[graph.layers + 1].astype(np.int64)
+        # T gates point at a qubit index that is not part of the mapping
+        qubits = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+        self.is_t_gate = ~np.isin(self.targets, qubits)
+        # Only T gates need the magic states, which an architecture may lack
+        self.nearest_magic_state_xy = (
+            geometry.nearest_magic_state_xy if self.is_t_gate.any() else None
+        )
+
+        size = max(
+            int(qubits.max(initial=0)),
+            int(self.controls.max(initial=0)),
+            int(self.targets.max(initial=0)),
+        )
+        self.coords = np.zeros((size + 1, 2), dtype=np.int64)
+        for q, (x, y) in mapping.items():
+            self.coords[q] = (x, y)
+
+        edges_by_qubit: dict[int, list[int]] = {}
+        for i, (c, t, is_t_gate) in enumerate(
+            zip(
+                self.controls.tolist(),
+                self.targets.tolist(),
+                self.is_t_gate.tolist(),
+                strict=True,
+            )
+        ):
+            edges_by_qubit.setdefault(c, []).append(i)
+            if not is_t_gate:
+                edges_by_qubit.setdefault(t, []).append(i)
+        self.edges_by_qubit = {
+            q: np.array(e, dtype=np.int64) for q, e in edges_by_qubit.items()
+        }
+        self._no_edges = np.zeros(0, dtype=np.int64)
+
+        self.boxes = self._edge_boxes(
+            self.coords[self.controls], self.coords[self.targets], self.is_t_gate
+        )
+        self.overlaps = self._count_all()
+
+    @property
+    def cost(self) -> int:
+        return self.overlaps
+
+    def _nearest_magic_states(self, points: np.ndarray) -> np.ndarray:
+        """
+        Returns the closest magic state (Manhattan distance) to each point.
+        Ties go to the magic state listed first in the architecture.
+        """
+        return self.nearest_magic_state_xy[points[:, 1] * self.width + points[:, 0]]
+
+    def _edge_boxes(
+        self, control_xy: np.ndarray, target_xy: np.ndarray, is_t_gate: np.ndarray
+    ) -> np.ndarray:
+        target_xy = target_xy.copy()
+        if is_t_gate.any():
+            target_xy[is_t_gate] = self._nearest_magic_states(control_xy[is_t_gate])
+        lo = np.minimum(control_xy, target_xy)
+        hi = np.maximum(control_xy, target_xy)
+        return np.stack((lo[:, 0], hi[:, 0], lo[:, 1], hi[:, 1]), axis=1)
+
+    @staticmethod
+    def _overlapping(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+        return ~(
+            (boxes1[:, 1] < boxes2[:, 0])
+            | (boxes2[:, 1] < boxes1[:, 0])
+            | (boxes1[:, 3] < boxes2[:, 2])
+            | (boxes2[:, 3] < boxes1[:, 2])
+        )
+
+    def _count_all(self) -> int:
+        overlaps = 0
+        for start in np.unique(self.layer_start).tolist():
+            overlaps += count_overlapping_boxes(
+                self.boxes[start : self.layer_end[start]]
+            )
+        return overlaps
+
+    def _affected_edges(self, qubit1: int, qubit2: int) -> np.ndarray:
+        return np.union1d(
+            self.edges_by_qubit.get(qubit1, self._no_edges),
+            self.edges_by_qubit.get(qubit2, self._no_edges),
+        )
+
+    def _swapped_coords(
+        self, qubits: np.ndarray, qubit1: np.ndarray, qubit2: np.ndarray
+    ) -> np.ndarray:
+        """
+        Coordinates of each qubit once qubit1 and qubit2 of its row trade places.
+        """
+        xy = self.coords[qubits]
+        is_qubit1 = qubits == qubit1
+        is_qubit2 = qubits == qubit2
+        xy[is_qubit1] = self.coords[qubit2[is_qubit1]]
+        xy[is_qubit2] = self.coords[qubit1[is_qubit2]]
+        return xy
+
+    def _swapped_boxes(
+        self, edges: np.ndarray, qubit1: np.ndarray | int, qubit2: np.ndarray | int
+    ) -> np.ndarray:
+        """
+        Boxes of the given edges once qubit1 and qubit2 trade places.
+        qubit1 and qubit2 are either single qubits or one per edge.
+        """
+        qubit1 = np.broadcast_to(qubit1, edges.shape)
+        qubit2 = np.broadcast_to(qubit2, edges.shape)
+        return self._edge_boxes(
+            self._swapped_coords(self.controls[edges], qubit1, qubit2),
+            self._swapped_coords(self.targets[edges], qubit1, qubit2),
+            self.is_t_gate[edges],
+        )
+
+    def swap_deltas(self, qubits1: np.ndarray, qubits2: np.ndarray) -> np.ndarray:
+        """
+        Scores a block of candidate swaps (qubits1[k], qubits2[k]) against the
+        current state in one vectorised pass, without applying any of them.
+        Returns the change in overlap count of every candidate.
+        """
+        qubits1 = np.asarray(qubits1, dtype=np.int64)
+        qubits2 = np.asarray(qubits2, dtype=np.int64)
+        num_candidates = len(qubits1)
+        if num_candidates == 0:
+            return np.zeros(0, dtype=np.int64)
+        parts = []
+        for qubit1, qubit2 in zip(qubits1.tolist(), qubits2.tolist(), strict=True):
+            parts.append(self.edges_by_qubit.get(qubit1, self._no_edges))
+            parts.append(self.edges_by_qubit.get(qubit2, self._no_edges))
+        lengths = np.array([len(part) for part in parts], dtype=np.int64)
+        owner = np.concatenate(parts)
+        part_index = np.repeat(np.arange(2 * num_candidates), lengths)
+        candidate = part_index >> 1
+        from_qubit2 = (part_index & 1).astype(bool)
+        # An edge between the two qubits is listed under both of them
+        touches_qubit1 = (self.controls[owner] == qubits1[candidate]) | (
+            self.targets[owner] == qubits1[candidate]
+        )
+        keep = ~(from_qubit2 & touches_qubit1)
+        owner, candidate = owner[keep], candidate[keep]
+
+        # Every (affected edge, other edge in the same layer) pair
+        lengths = self.layer_end[owner] - self.layer_start[owner]
+        pair_owner = np.repeat(np.arange(len(owner)), lengths)
+        offsets = np.arange(len(pair_owner)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        partner = np.repeat(self.layer_start[owner], lengths) + offsets
+        keep = partner != owner[pair_owner]
+        pair_owner, partner = pair_owner[keep], partner[keep]
+        pair_candidate = candidate[pair_owner]
+        pair_qubit1 = qubits1[pair_candidate]
+        pair_qubit2 = qubits2[pair_candidate]
+        partner_controls = self.controls[partner]
+        partner_targets = self.targets[partner]
+        partner_affected = (
+            (partner_controls == pair_qubit1)
+            | (partner_controls == pair_qubit2)
+            | (partner_targets == pair_qubit1)
+            | (partner_targets == pair_qubit2)
+        )
+
+        # Swapped boxes of the affected edges and affected partners at once
+        swapped = np.concatenate((owner, partner[partner_affected]))
+        swapped_candidate = np.concatenate(
+            (candidate, pair_candidate[partner_affected])
+        )
+        swapped_boxes = self._swapped_boxes(
+            swapped, qubits1[swapped_candidate], qubits2[swapped_candidate]
+        )
+        new_owner_boxes = swapped_boxes[: len(owner)]
+        new_partner_boxes = self.boxes[partner]
+        new_partner_boxes[partner_affected] = swapped_boxes[len(owner) :]
+        before = self._overlapping(self.boxes[owner[pair_owner]], self.boxes[partner])
+        after = self._overlapping(new_owner_boxes[pair_owner], new_partner_boxes)
+        diff = after.astype(np.int64) - before
+        # Pairs of two affected edges are seen from both sides, so weigh the
+        # others twice and halve the total
+        doubled = np.bincount(
+            pair_candidate,
+            weights=diff * np.where(partner_affected, 1, 2),
+            minlength=num_candidates,
+        )
+        return np.rint(doubled).astype(np.int64) // 2
+
+    def apply_swap(self, qubit1: int, qubit2: int, delta: int) -> None:
+        """
+        Applies a swap scored by swap_deltas() against the current state.
+        """
+        affected = self._affected_edges(qubit1, qubit2)
+        self.boxes[affected] = self._swapped_boxes(affected, qubit1, qubit2)
+        self.coords[[qubit1, qubit2]] = self.coords[[qubit2, qubit1]]
+        self.overlaps += delta
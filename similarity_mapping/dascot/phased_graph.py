@@ -1,10 +1,43 @@
 import itertools
 import random
 import time
-from qiskit.converters import circuit_to_dag, dag_to_circuit
-from qiskit.dagcircuit.dagnode import DAGNode, DAGOpNode, DAGInNode, DAGOutNode
-from qiskit import QuantumCircuit
+from dataclasses import dataclass
+from collections.abc import Callable
 import numpy as np
+from .architecture import geometry_for_arch
+from .layering import (
+    CompactPhasedGraph,
+    build_compact_phased_graph,
+    as_compact_phased_graph,
+)
+from .overlaps import OverlapEngine
+from .surrogate import SurrogateEngine
+from .schedules import GeometricSchedule
+from .deadline import Deadline
+from .history import MappingHistory
+
+
+@dataclass
+class AnnealStats:
+    """
+    Filled in by sim_anneal when passed as `stats`.
+    The final mapping is the chain's current state (2D coordinates) when it stopped.
+    """
+
+    steps: int = 0
+    accepted: int = 0
+    initial_overlaps: int = 0
+    best_overlaps: int = 0
+    final_overlaps: int = 0
+    final_temperature: float = 0.0
+    elapsed_sec: float = 0.0
+    final_mapping: dict | None = None
+    stop_reason: str = ""
+
+
+# Runs that start from an already good mapping (a bootstrapped mapping or
+# phase two of a surrogate run) start this much colder than random starts
+WARM_START_TEMP_FACTOR = 0.1
 
 
 ## Random
@@ -15,6 +48,8 @@ def build_random_map(log_qubits, arch):
 
 
 def build_phased_connectivity_graph(circuit, include_t=True):
+    from qiskit.converters import circuit_to_dag, dag_to_circuit
+
     dag = circuit_to_dag(circuit)
     gates = []
     phased_graphs = {
@@ -41,6 +76,9 @@ def build_phased_connectivity_graph(circuit, include_t=True):
 
 
 def build_phased_connectivity_graph_fast(circuit, include_t=True):
+    from qiskit.converters import circuit_to_dag
+    from qiskit.dagcircuit.dagnode import DAGOpNode
+
     dag = circuit_to_dag(circuit)
     gates = []
     phased_graphs = {
@@ -178,24 +216,24 @@ def update_overlaps(phased_graphs, arch, old_mapping, new_mapping, qubit1, qubit
 
 def count_overlapping_fast(mapping, phased_graphs, arch):
     overlaps = 0
-    grid_len = arch["width"]
-    magic_states = arch["magic_states"]
-    for g in phased_graphs.values():
+    geometry = geometry_for_arch(arch)
+    phased_graphs = as_compact_phased_graph(phased_graphs)
+    # Only T gates need the magic states, which an architecture may lack
+    nearest_magic_state_xy = (
+        geometry.nearest_magic_state_xy.tolist()
+        if (phased_graphs.targets == phased_graphs.num_qubits).any()
+        else []
+    )
+    for layer in range(phased_graphs.num_layers):
         edge_min_max = {}
-        edges = {x for q in g.keys() for x in g[q]}
+        edges = phased_graphs.layer_edges(layer)
         for edge in edges:
             c, t = edge
             if t in mapping.keys():
                 xmin, xmax = sorted([mapping[c][0], mapping[t][0]])
                 ymin, ymax = sorted([mapping[c][1], mapping[t][1]])
             else:
-                magic_states_2d = [
-                    tuple(reversed(divmod(m, grid_len))) for m in magic_states
-                ]
-                closest = min(
-                    magic_states_2d,
-                    key=lambda p: abs(p[0] - mapping[c][0]) + abs(p[1] - mapping[c][1]),
-                )
+                closest = nearest_magic_state_xy[geometry.cell(*mapping[c])]
                 xmin, xmax = sorted([mapping[c][0], closest[0]])
                 ymin, ymax = sorted([mapping[c][1], closest[1]])
             edge_min_max[tuple(edge)] = (xmin, xmax, ymin, ymax)
@@ -210,13 +248,19 @@ def count_overlapping_fast(mapping, phased_graphs, arch):
 
 def update_overlaps_fast(phased_graphs, arch, old_mapping, new_mapping, qubit1, qubit2):
     overlap_delta = 0
-    grid_len = arch["width"]
-    magic_states = arch["magic_states"]
-    for g in phased_graphs.values():
-        modified_edges = g[qubit1].union(g[qubit2])
+    geometry = geometry_for_arch(arch)
+    phased_graphs = as_compact_phased_graph(phased_graphs)
+    # Only T gates need the magic states, which an architecture may lack
+    nearest_magic_state_xy = (
+        geometry.nearest_magic_state_xy.tolist()
+        if (phased_graphs.targets == phased_graphs.num_qubits).any()
+        else []
+    )
+    for layer in range(phased_graphs.num_layers):
+        all_edges = phased_graphs.layer_edges(layer)
+        modified_edges = [e for e in all_edges if qubit1 in e or qubit2 in e]
         edge_min_max_old = {}
         edge_min_max_new = {}
-        all_edges = {x for q in g.keys() for x in g[q]}
         for edge in all_edges:
             c, t = edge
             if t in old_mapping.keys():
@@ -225,21 +269,10 @@ def update_overlaps_fast(phased_graphs, arch, old_mapping, new_mapping, qubit1,
                 xmin_new, xmax_new = sorted([new_mapping[c][0], new_mapping[t][0]])
                 ymin_new, ymax_new = sorted([new_mapping[c][1], new_mapping[t][1]])
             else:
-                magic_states_2d = [
-                    tuple(reversed(divmod(m, grid_len))) for m in magic_states
-                ]
-                closest_old = min(
-                    magic_states_2d,
-                    key=lambda p: abs(p[0] - old_mapping[c][0])
-                    + abs(p[1] - old_mapping[c][1]),
-                )
+                closest_old = nearest_magic_state_xy[geometry.cell(*old_mapping[c])]
                 xmin_old, xmax_old = sorted([old_mapping[c][0], closest_old[0]])
                 ymin_old, ymax_old = sorted([old_mapping[c][1], closest_old[1]])
-                closest_new = min(
-                    magic_states_2d,
-                    key=lambda p: abs(p[0] - new_mapping[c][0])
-                    + abs(p[1] - new_mapping[c][1]),
-                )
+                closest_new = nearest_magic_state_xy[geometry.cell(*new_mapping[c])]
                 xmin_new, xmax_new = sorted([new_mapping[c][0], closest_new[0]])
                 ymin_new, ymax_new = sorted([new_mapping[c][1], closest_new[1]])
             edge_min_max_old[tuple(edge)] = (xmin_old, xmax_old, ymin_old, ymax_old)
@@ -262,6 +295,15 @@ def update_overlaps_fast(phased_graphs, arch, old_mapping, new_mapping, qubit1,
     return overlap_delta
 
 
+def _history_capacity(schedule: GeometricSchedule, max_steps) -> int:
+    """
+    Rows to preallocate for a history; one spare row covers rounding in the
+    schedule's step bound. Unbounded runs start small and grow.
+    """
+    limits = [n for n in (schedule.step_bound(), max_steps) if n is not None]
+    return min(limits, default=1024) + 1
+
+
 def sim_anneal(
     mapping,
     phased_graphs_fast,
@@ -271,60 +313,153 @@ def sim_anneal(
     cooling_rate=0.1,
     termination_temp=0.1,
     timeout=3600,
+    max_steps=None,
+    stats: AnnealStats | None = None,
+    batch_size=32,
+    surrogate=False,
+    schedule: GeometricSchedule | None = None,
+    progress: Callable[[dict, int], None] | None = None,
+    history: MappingHistory | None = None,
+    deadline: Deadline | None = None,
 ):
+    """
+    The chain stops with reason "timeout" after `timeout` seconds or once
+    `deadline` expires, whichever comes first.
+
+    With `retain_history` every step's proposed mapping and its cost are
+    written to `history` (an in-memory MappingHistory sized from the schedule
+    if not given), which is returned instead of the best mapping.
+
+    The temperature follows `schedule`, by default a GeometricSchedule built
+    from `temperature`, `cooling_rate` and `termination_temp`.
+    `progress` is called with a copy of the incumbent mapping and its cost
+    at the start and whenever the best cost improves.
+
+    With `surrogate` set the chain anneals on the cheap SurrogateEngine cost
+    instead of the overlap count; the returned and recorded costs are then
+    surrogate costs.
+
+    Candidate swaps are drawn and scored in blocks of up to `batch_size`
+    against the current mapping, and the Metropolis test runs over the block
+    in step order. Rejected steps leave the mapping unchanged, so the block
+    stays valid up to its first accepted swap, which is applied, and the
+    rest of the block is dropped. The block size adapts to the acceptance rate.
+    """
     current_mapping = mapping.copy()
     best_mapping = mapping.copy()
-    # best_overlaps = count_overlapping(mapping, phased_graphs,arch)
-    best_overlaps = count_overlapping_fast(mapping, phased_graphs_fast, arch)
+    engine_class = SurrogateEngine if surrogate else OverlapEngine
+    engine = engine_class(mapping, phased_graphs_fast, arch)
+    initial_overlaps = engine.cost
+    best_overlaps = initial_overlaps
     current_overlaps = best_overlaps
-    # assert(best_overlaps == best_overlaps_fast)
-    visited = []
+    qubits = np.fromiter(mapping.keys(), dtype=int)
     start = time.time()
     current = start
     steps = 0
-    while (
-        temperature > termination_temp
-        and best_overlaps > 0
-        and current - start < timeout
-    ):
-        steps += 1
-        new_mapping = current_mapping.copy()
-        qubit1, qubit2 = np.random.choice(
-            np.fromiter(mapping.keys(), dtype=int), size=2, replace=False
+    accepted = 0
+    block_size = 1
+    if schedule is None:
+        schedule = GeometricSchedule(temperature, cooling_rate, termination_temp)
+    if retain_history and history is None:
+        history = MappingHistory(
+            list(mapping.keys()), _history_capacity(schedule, max_steps)
         )
-        new_mapping[qubit1], new_mapping[qubit2] = (
-            new_mapping[qubit2],
-            new_mapping[qubit1],
+    if history is not None:
+        geometry = geometry_for_arch(arch)
+        columns = {q: i for i, q in enumerate(history.qubits)}
+        # Flat position in each history column, and the column of each qubit
+        positions = np.array(
+            [geometry.cell(*mapping[q]) for q in history.qubits], dtype=np.int16
         )
-        # delta = update_overlaps(phased_graphs, arch, best_mapping, new_mapping, qubit1, qubit2)
-        delta_curr = update_overlaps_fast(
-            phased_graphs_fast, arch, current_mapping, new_mapping, qubit1, qubit2
-        )
-        delta_best = update_overlaps_fast(
-            phased_graphs_fast, arch, best_mapping, new_mapping, qubit1, qubit2
+        qubit_columns = np.array([columns[q] for q in qubits.tolist()], dtype=int)
+    if progress is not None:
+        progress(best_mapping.copy(), best_overlaps)
+
+    def stop_reason():
+        if best_overlaps == 0:
+            return "zero_overlaps"
+        if current - start >= timeout or (
+            deadline is not None and deadline.expired()
+        ):
+            return "timeout"
+        if max_steps is not None and steps >= max_steps:
+            return "max_steps"
+        if schedule.finished():
+            return "stalled" if schedule.stalled() else "temperature"
+        return ""
+
+    while not stop_reason():
+        # Temperature at each step of the block, cut at the termination
+        # temperature and the step limit
+        temperatures = schedule.temperatures(block_size)
+        allowed = len(temperatures)
+        if max_steps is not None:
+            allowed = min(allowed, max_steps - steps)
+        index1 = np.random.randint(len(qubits), size=allowed)
+        index2 = np.random.randint(len(qubits) - 1, size=allowed)
+        index2 += index2 >= index1
+        qubits1, qubits2 = qubits[index1], qubits[index2]
+        deltas = engine.swap_deltas(qubits1, qubits2)
+        accept = (deltas < 0) | (
+            np.random.rand(allowed)
+            < np.exp(-np.maximum(deltas, 0) / temperatures[:allowed])
         )
-        # assert delta == delta_fast, f"{delta}, {delta_fast}"
-        new_overlaps = current_overlaps + delta_curr
-        if retain_history:
-            visited.append((new_mapping, new_overlaps))
-        if delta_curr < 0 or np.random.rand() < np.exp(-delta_curr / temperature):
-            current_mapping = new_mapping
-            current_overlaps = new_overlaps
-        if delta_best < 0 or np.random.rand():
-            best_mapping = new_mapping
-            best_overlaps = new_overlaps
-        temperature *= 1 - cooling_rate
+        accepted_at = int(np.argmax(accept)) if accept.any() else None
+        taken = allowed if accepted_at is None else accepted_at + 1
+        if history is not None:
+            step_rows = np.arange(taken)
+            columns1 = qubit_columns[index1[:taken]]
+            columns2 = qubit_columns[index2[:taken]]
+            rows = np.repeat(positions[None, :], taken, axis=0)
+            rows[step_rows, columns1] = positions[columns2]
+            rows[step_rows, columns2] = positions[columns1]
+            history.extend(rows, current_overlaps + deltas[:taken])
+        steps += taken
+        improved = False
+        if accepted_at is None:
+            block_size = min(2 * block_size, batch_size)
+        else:
+            qubit1, qubit2 = qubits1[accepted_at], qubits2[accepted_at]
+            delta_curr = int(deltas[accepted_at])
+            engine.apply_swap(qubit1, qubit2, delta_curr)
+            accepted += 1
+            current_mapping[qubit1], current_mapping[qubit2] = (
+                current_mapping[qubit2],
+                current_mapping[qubit1],
+            )
+            current_overlaps += delta_curr
+            if history is not None:
+                column1, column2 = columns1[-1], columns2[-1]
+                positions[[column1, column2]] = positions[[column2, column1]]
+            if current_overlaps < best_overlaps:
+                best_mapping = current_mapping.copy()
+                best_overlaps = current_overlaps
+                improved = True
+                if progress is not None:
+                    progress(best_mapping.copy(), best_overlaps)
+            block_size = max(1, min(2 * taken, batch_size))
+        schedule.update(taken, accepted_at is not None, improved)
         current = time.time()
     # print(f"mapping sa steps {steps}")
+    if stats is not None:
+        stats.steps = steps
+        stats.accepted = accepted
+        stats.initial_overlaps = initial_overlaps
+        stats.best_overlaps = best_overlaps
+        stats.final_overlaps = current_overlaps
+        stats.final_temperature = schedule.temperature
+        stats.elapsed_sec = current - start
+        stats.final_mapping = current_mapping
+        stats.stop_reason = stop_reason()
     if retain_history:
-        return visited
+        return history
     else:
         return best_mapping, best_overlaps
 
 
 def build_phased_map(
     log_qubits,
-    circ,
+    gates,
     arch,
     initial_temp,
     cooling_rate,
@@ -333,55 +468,111 @@ def build_phased_map(
     include_t=True,
     retain_history=False,
     initial_mapping: dict | None = None,
+    max_steps=None,
+    stats: AnnealStats | None = None,
+    surrogate_timeout=0,
+    surrogate_stats: AnnealStats | None = None,
+    schedule: Callable[..., GeometricSchedule] = GeometricSchedule,
+    progress: Callable[[list, int], None] | None = None,
+    warm_start_temp_factor=WARM_START_TEMP_FACTOR,
+    history_path=None,
+    deadline: Deadline | None = None,
+    phased_graph: CompactPhasedGraph | None = None,
 ):
-    grid_len = arch["width"]
+    """
+    With `retain_history` the run records every step and returns a
+    MappingHistory, which iterates as the (qubit, position) tuples and
+    overlap count of each step. `history_path` streams it to a .npy file.
+
+    A positive `surrogate_timeout` enables a two-phase run: phase one anneals
+    on the surrogate cost for up to `surrogate_timeout` seconds, phase two
+    refines its best mapping on the exact overlap count for up to `timeout`
+    seconds. `surrogate_stats` and `stats` collect the statistics of the two phases.
+
+    Each phase builds its schedule with
+    `schedule(initial_temp, cooling_rate, term_temp)`. Runs from an
+    `initial_mapping` and phase two start `warm_start_temp_factor` colder.
+    `progress` gets every new incumbent of the exact phase as
+    (qubit, position) tuples together with its overlap count.
+    Every phase also stops once `deadline` expires.
+
+    `phased_graph` is the circuit's compact phased graph if the caller
+    already built it with the same `include_t`.
+    """
+    geometry = geometry_for_arch(arch)
     faces = arch["alg_qubits"]
     map_flat = {}
+    warm_start = initial_mapping is not None
     if initial_mapping is None:
         map_tuples = build_random_map(log_qubits, arch)
         map_flat = {t[0]: t[1] for t in map_tuples}
     else:
         map_flat = initial_mapping
-    map_2d = {k: tuple(reversed(divmod(v, grid_len))) for k, v in map_flat.items()}
+    map_2d = {k: geometry.coords(v) for k, v in map_flat.items()}
     initial_mapping = map_2d
     # initial_mapping = {i : tuple(reversed(divmod(faces[i], grid_len))) for i in range(log_num)}
 
-    p_g_fast = build_phased_connectivity_graph_fast(circ, include_t=include_t)
+    p_g_fast = phased_graph
+    if p_g_fast is None:
+        # T gate sentinel, 0 for an empty circuit as circuit_depth([]) is 0
+        num_qubits = max((q for gate in gates for q in gate), default=-1) + 1
+        p_g_fast = build_compact_phased_graph(gates, num_qubits, include_t=include_t)
+    warm_temp = initial_temp * warm_start_temp_factor
+    if surrogate_timeout > 0 and not retain_history:
+        surrogate_temp = warm_temp if warm_start else initial_temp
+        initial_mapping, _ = sim_anneal(
+            initial_mapping,
+            p_g_fast,
+            arch,
+            timeout=surrogate_timeout,
+            retain_history=False,
+            stats=surrogate_stats,
+            surrogate=True,
+            schedule=schedule(surrogate_temp, cooling_rate, term_temp),
+            deadline=deadline,
+        )
+        warm_start = True
     if retain_history:
-        mappings = sim_anneal(
+        history_schedule = schedule(1, 0.001, 0.1)
+        history = MappingHistory(
+            list(initial_mapping.keys()),
+            _history_capacity(history_schedule, max_steps),
+            history_path,
+        )
+        sim_anneal(
             initial_mapping,
             p_g_fast,
             arch,
             timeout=timeout,
-            temperature=1,
-            cooling_rate=0.001,
             retain_history=True,
+            max_steps=max_steps,
+            stats=stats,
+            schedule=history_schedule,
+            history=history,
+            deadline=deadline,
         )
-        return [
-            (
-                [(key, val[1] * grid_len + val[0]) for key, val in mapping.items()],
+        history.close()
+        return history
+    else:
+        def report(mapping_2d, overlaps):
+            progress(
+                [(key, geometry.cell(*val)) for key, val in mapping_2d.items()],
                 overlaps,
             )
-            for mapping, overlaps in mappings  # type: ignore
-        ]
-    else:
+
         final_mapping, cost = sim_anneal(
             initial_mapping,
             p_g_fast,
             arch,
             timeout=timeout,
-            temperature=initial_temp,
-            cooling_rate=cooling_rate,
-            termination_temp=term_temp,
             retain_history=False,
+            max_steps=max_steps,
+            stats=stats,
+            schedule=schedule(
+                warm_temp if warm_start else initial_temp, cooling_rate, term_temp
+            ),
+            progress=None if progress is None else report,
+            deadline=deadline,
         )
-        tuples = [
-            (key, val[1] * grid_len + val[0]) for key, val in final_mapping.items()
-        ]
+        tuples = [(key, geometry.cell(*val)) for key, val in final_mapping.items()]
         return tuples, cost
-
-
-if __name__ == "__main__":
-    log_num = 100
-    circ = QuantumCircuit.from_qasm_file("qft-like/simple_qft_q100.qasm")
-    build_phased_map(log_num, circ, 10, 10, [], retain_history=False)  # type: ignore
@@ -2,15 +2,24 @@
 import itertools
 import math
 import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import numpy as np
-from .architecture import vertical_neighbors, horizontal_neighbors
+from .architecture import ArchitectureGeometry, geometry_for_arch
+from .deadline import Deadline
+from .masked_grid import MaskedGrid, masked_grid_for
+from .scheduler import DependencyDAG, FrontLayerScheduler
 import rustworkx as rx
 
 
 def route_gate(
-    indexed_gate, grid_len, grid_height, msf_faces, mapping, to_remove, take_first_ms
+    indexed_gate,
+    geometry: ArchitectureGeometry,
+    mapping,
+    to_remove,
+    take_first_ms,
 ):
-    device_graph = rx.generators.grid_graph(rows=grid_height, cols=grid_len)  # type: ignore
+    device_graph = rx.generators.grid_graph(geometry.height, geometry.width)  # type: ignore
     device_graph.remove_nodes_from(list(to_remove))
     shortest_path_len = 2**31 - 1
     shortest_pair = None
@@ -19,34 +28,16 @@ def route_gate(
     if len(gate) == 2:
         pairs = [
             (vn, hn)
-            for vn in vertical_neighbors(
-                mapping[gate[0]], grid_len, grid_height, omitted_edges=[]
-            )
-            for hn in horizontal_neighbors(
-                mapping[gate[1]], grid_len, grid_height, omitted_edges=[]
-            )
+            for vn in geometry.vertical_neighbors(mapping[gate[0]])
+            for hn in geometry.horizontal_neighbors(mapping[gate[1]])
         ]
     else:
-        sorted_msf = sorted(
-            msf_faces,
-            key=lambda m: abs(
-                list(reversed(divmod(m, grid_len)))[0]
-                - list(reversed(divmod(mapping[gate[0]], grid_len)))[0]
-            )
-            + abs(
-                list(reversed(divmod(m, grid_len)))[1]
-                - list(reversed(divmod(mapping[gate[0]], grid_len)))[1]
-            ),
-        )
+        sorted_msf = geometry.magic_states_by_distance[mapping[gate[0]]].tolist()
         pairs = [
             (vn, hn)
             for magic_state in sorted_msf
-            for vn in vertical_neighbors(
-                mapping[gate[0]], grid_len, grid_height, omitted_edges=[]
-            )
-            for hn in horizontal_neighbors(
-                magic_state, grid_len, grid_height, omitted_edges=[]
-            )
+            for vn in geometry.vertical_neighbors(mapping[gate[0]])
+            for hn in geometry.horizontal_neighbors(magic_state)
         ]
     pairs = filter(
         lambda p: device_graph.has_node(p[0]) and device_graph.has_node(p[1]), pairs
@@ -80,20 +71,127 @@ def route_gate(
     return route, to_remove
 
 
+def route_gate_fast(indexed_gate, grid: MaskedGrid, mapping, take_first_ms):
+    """
+    Routes a gate like route_gate, with the grid's blocked cells standing in
+    for `to_remove`. The routed path is blocked on the grid.
+
+    route_gate tries every (source, target) pair in order and keeps the
+    first shortest one, or for T gates with `take_first_ms` the first
+    reachable one. A single search from all free sources finds the same
+    pair: each target is ranked by (magic state rank, source rank, target
+    rank), which is the pair order of route_gate. The path is then traced
+    in rustworkx's order so routes match route_gate exactly.
+    """
+    id, gate = indexed_gate
+    blocked = grid.blocked
+    sources = [s for s in grid.vertical[mapping[gate[0]]] if not blocked[s]]
+    if len(gate) == 2:
+        targets = {
+            t: (0, rank)
+            for rank, t in enumerate(grid.horizontal[mapping[gate[1]]])
+            if not blocked[t]
+        }
+    else:
+        targets = {
+            t: key
+            for t, key in grid.t_gate_targets(mapping[gate[0]]).items()
+            if not blocked[t]
+        }
+    if not sources or not targets:
+        return []
+    found = grid.search(sources, targets, exhaustive=take_first_ms and len(gate) == 1)
+    if not found:
+        return []
+    t, (_, rank) = min(
+        found.items(),
+        key=lambda item: (targets[item[0]][0], item[1][1], targets[item[0]][1]),
+    )
+    path = grid.path(sources[rank], t)
+    grid.block(path)
+    return [(id, gate, path)]
+
+
 def try_order(
-    order, executable, grid_len, grid_height, msf_faces, mapping, take_first_ms
+    order, executable, geometry: ArchitectureGeometry, mapping, take_first_ms
 ):
     step = []
-    to_remove = initialize_to_remove(msf_faces, mapping)
+    grid = masked_grid_for(geometry)
+    grid.reset(initialize_to_remove(geometry.magic_states, mapping))
+    executable_items = list(executable.items())
     for i in range(len(executable)):
-        gate = list(executable.items())[order[i]]
-        route, to_remove = route_gate(
-            gate, grid_len, grid_height, msf_faces, mapping, to_remove, take_first_ms
+        step.extend(
+            route_gate_fast(executable_items[order[i]], grid, mapping, take_first_ms)
         )
-        step.extend(route)
     return step
 
 
+# Trie nodes a PrefixRouteCache keeps before it stops caching new prefixes
+MAX_PREFIX_NODES = 4096
+
+
+class _PrefixNode:
+    __slots__ = ("step", "blocked", "children")
+
+    def __init__(self, step, blocked: bytes) -> None:
+        self.step = step
+        self.blocked = blocked
+        self.children: dict[int, _PrefixNode] = {}
+
+
+class PrefixRouteCache:
+    """
+    Routes the gate orders tried within one timestep like try_order, sharing
+    the work between orders with a common prefix.
+
+    A gate's route only depends on the cells blocked by the gates routed
+    before it. Orders are stored in a trie whose nodes keep the routes of
+    their prefix and a snapshot of the blocked cells after it, so an order
+    only routes the gates after its longest cached prefix.
+    """
+
+    def __init__(
+        self,
+        executable,
+        geometry: ArchitectureGeometry,
+        mapping,
+        take_first_ms,
+        max_nodes: int = MAX_PREFIX_NODES,
+    ) -> None:
+        self.executable_items = list(executable.items())
+        self.grid = masked_grid_for(geometry)
+        self.mapping = mapping
+        self.take_first_ms = take_first_ms
+        self.max_nodes = max_nodes
+        self.grid.reset(initialize_to_remove(geometry.magic_states, mapping))
+        self.root = _PrefixNode([], bytes(self.grid.blocked))
+        self.nodes = 1
+
+    def route(self, order) -> list:
+        node = self.root
+        depth = 0
+        while depth < len(order) and order[depth] in node.children:
+            node = node.children[order[depth]]
+            depth += 1
+        step = list(node.step)
+        if depth == len(order):
+            return step
+        grid = self.grid
+        grid.blocked[:] = node.blocked
+        for index in order[depth:]:
+            step.extend(
+                route_gate_fast(
+                    self.executable_items[index], grid, self.mapping, self.take_first_ms
+                )
+            )
+            if self.nodes < self.max_nodes:
+                child = _PrefixNode(list(step), bytes(grid.blocked))
+                node.children[index] = child
+                node = child
+                self.nodes += 1
+        return step
+
+
 def initialize_to_remove(msf_faces, mapping):
     to_remove = set()
     for q in mapping.keys():
@@ -103,40 +201,14 @@ def initialize_to_remove(msf_faces, mapping):
     return to_remove
 
 
-def shortest_path(gate, mapping, grid_len, grid_height, msf_faces):
-    shortest_path_len = 2**31 - 1
-    if len(gate) == 1:
-        return shortest_path_len
+def shortest_path(gate, mapping, geometry: ArchitectureGeometry):
+    """
+    Length of the shortest route of a gate on the empty grid, where it is
+    the Manhattan distance between the closest pair of ports.
+    """
     if len(gate) == 2:
-        pairs = [
-            (vn, hn)
-            for vn in vertical_neighbors(
-                mapping[gate[0]], grid_len, grid_height, omitted_edges=[]
-            )
-            for hn in horizontal_neighbors(
-                mapping[gate[1]], grid_len, grid_height, omitted_edges=[]
-            )
-        ]
-    else:
-        pairs = [
-            (vn, hn)
-            for magic_state in msf_faces
-            for vn in vertical_neighbors(
-                mapping[gate[0]], grid_len, grid_height, omitted_edges=[]
-            )
-            for hn in horizontal_neighbors(
-                magic_state, grid_len, grid_height, omitted_edges=[]
-            )
-        ]
-    for s, t in pairs:
-        dist = rx.dijkstra_shortest_path_lengths(
-            rx.generators.grid_graph(rows=grid_height, cols=grid_len),  # type: ignore
-            node=s,
-            goal=t,
-        )[t]  # type: ignore
-        if dist < shortest_path_len:
-            shortest_path_len = dist
-    return shortest_path_len
+        return geometry.cnot_port_distance(mapping[gate[0]], mapping[gate[1]])
+    return int(geometry.t_port_distance[mapping[gate[0]]])
 
 
 def gates_routed(step, remaining_gates, crit_dict):
@@ -160,6 +232,14 @@ def criticality_fast(step, remaining_gates, crit_dict):
     return paths
 
 
+def criticality_exact(step, remaining_gates, chain_lengths):
+    """
+    Same value as criticality, with the longest chain of dependents of
+    each gate taken from DependencyDAG.chain_lengths.
+    """
+    return sum(1 + chain_lengths[id] for id, qubits, path in step)
+
+
 def build_crit_dict(gates):
     crit_dict = {}
     for id, qubits in gates.items():
@@ -179,7 +259,40 @@ def build_crit_dict_fast(gates):
     return crit_dict
 
 
-def dependent(step, remaining_gates):
+def build_crit_dict_linear(gates):
+    """
+    Same values as build_crit_dict_fast from one reverse pass over the gates,
+    whose ids run from 0 to len(gates) - 1 in circuit order.
+
+    A gate's criticality is the longest chain of dependent gates from it to
+    the last gate on each of its qubits. Walking backwards, each qubit keeps
+    the chain lengths from the next gate on it to the last gate of every
+    qubit, so a gate's lengths are one more than those of its successors.
+    """
+    qubits = {q for gate in gates.values() for q in gate}
+    line = {q: i for i, q in enumerate(qubits)}
+    # Longest chains from the next gate on each qubit, None past its last gate
+    chains: list[np.ndarray | None] = [None] * len(line)
+    unreachable = np.full(len(line), -(2**62), dtype=np.int64)
+    crit_dict = {}
+    for id in reversed(range(len(gates))):
+        lines = [line[q] for q in gates[id]]
+        successors = [chains[l] for l in lines if chains[l] is not None]
+        if not successors:
+            lengths = unreachable.copy()
+        elif len(successors) == 1:
+            lengths = successors[0] + 1
+        else:
+            lengths = np.maximum.reduce(successors) + 1
+        for l in lines:
+            if chains[l] is None:
+                lengths[l] = 1
+            chains[l] = lengths
+        crit_dict[id] = int(lengths[lines].max())
+    return crit_dict
+
+
+def dependent(step, remaining_gates, crit_dict):
     deps = 0
     for id, qubits, path in step:
         dependent = get_dependent_gates((id, qubits), remaining_gates)
@@ -187,6 +300,58 @@ def dependent(step, remaining_gates):
     return deps
 
 
+def dependent_fast(step, remaining_gates, dependent_counts):
+    """
+    Same value as dependent, with the dependents of each gate counted by
+    DependencyDAG.dependent_counts.
+    """
+    return sum(dependent_counts[id] for id, qubits, path in step)
+
+
+def build_reward_table(reward_name, gates):
+    """
+    Per-gate values the reward `reward_name` sums over a step, computed
+    once per circuit.
+    """
+    if reward_name == "criticality":
+        return build_crit_dict_linear(gates)
+    if reward_name == "criticality_exact":
+        return DependencyDAG(gates).chain_lengths
+    if reward_name == "dependent":
+        return DependencyDAG(gates).dependent_counts
+    return {}
+
+
+REWARD_FUNCTIONS = {
+    "gates_routed": gates_routed,
+    "criticality": criticality_fast,
+    "criticality_exact": criticality_exact,
+    "dependent": dependent_fast,
+}
+# Fewest exhaustive orders worth sending to an order pool
+MIN_PARALLEL_ORDERS = 48
+
+
+def _best_of_orders(
+    orders, executable, arch, mapping, take_first_ms, reward_name, crit_dict
+):
+    """
+    Routes `orders` and returns (reward, index, step) of the first order with
+    the highest reward. Runs in the workers of an order pool.
+    """
+    router = PrefixRouteCache(
+        executable, geometry_for_arch(arch), mapping, take_first_ms
+    )
+    reward_func = REWARD_FUNCTIONS[reward_name]
+    best = None
+    for index, order in enumerate(orders):
+        step = router.route(order)
+        reward = reward_func(step, None, crit_dict)
+        if best is None or reward > best[0]:
+            best = (reward, index, step)
+    return best
+
+
 def best_realizable_set_found(
     gates,
     executable,
@@ -200,87 +365,57 @@ def best_realizable_set_found(
     cooling_rate=0.1,
     termination_temp=0.1,
     take_first_ms=False,
+    order_pool: ProcessPoolExecutor | None = None,
+    order_workers=1,
+    deadline: Deadline | None = None,
 ):
+    """
+    With an `order_pool` of `order_workers` processes, large exhaustive
+    timesteps split their orders into one contiguous chunk per worker. The
+    first best order of the chunks is the one the sequential search keeps.
+    Once `deadline` expires the search returns the best step found so far.
+    """
+    if deadline is None:
+        deadline = Deadline()
     # print(mapping)
-    grid_len = arch["width"]
-    grid_height = arch["height"]
-    msf_faces = arch["magic_states"]
+    geometry = geometry_for_arch(arch)
     t_indices = [
         i for (i, (id, gate)) in enumerate(executable.items()) if len(gate) == 1
     ]
     cnot_indices = [
         i for (i, (id, gate)) in enumerate(executable.items()) if len(gate) == 2
     ]
+    router = PrefixRouteCache(executable, geometry, mapping, take_first_ms)
     if initial_order == "naive":
         best_order = cnot_indices + t_indices
-        best_step = try_order(
-            best_order,
-            executable,
-            grid_len,
-            grid_height,
-            msf_faces,
-            mapping,
-            take_first_ms,
-        )
+        best_step = router.route(best_order)
         current_order = best_order
         current_step = best_step
     elif initial_order == "random":
         best_order = cnot_indices + t_indices
         random.shuffle(best_order)
-        best_step = try_order(
-            best_order,
-            executable,
-            grid_len,
-            grid_height,
-            msf_faces,
-            mapping,
-            take_first_ms,
-        )
+        best_step = router.route(best_order)
         current_order = best_order
         current_step = best_step
     elif initial_order == "shortest_first":
+        executable_gates = list(executable.values())
         shortest_cnot = sorted(
-            tuple(range(len(cnot_indices))),
-            key=lambda x: shortest_path(
-                list(executable.items())[x][1],
-                mapping,
-                grid_len,
-                grid_height,
-                msf_faces,
-            ),
+            cnot_indices,
+            key=lambda x: shortest_path(executable_gates[x], mapping, geometry),
         )
         shortest_t = sorted(
-            tuple(range(len(t_indices))),
-            key=lambda x: shortest_path(
-                list(executable.items())[x][1],
-                mapping,
-                grid_len,
-                grid_height,
-                msf_faces,
-            ),
+            t_indices,
+            key=lambda x: shortest_path(executable_gates[x], mapping, geometry),
         )
         shortest_first = shortest_cnot + shortest_t
         best_order = shortest_first
-        best_step = try_order(
-            best_order,
-            executable,
-            grid_len,
-            grid_height,
-            msf_faces,
-            mapping,
-            take_first_ms,
-        )
+        best_step = router.route(best_order)
         current_order = best_order
         current_step = best_step
-    routed_ids = [x[0] for x in best_step]  # type: ignore
-    best_remaining_gates = {k: v for k, v in gates.items() if k not in routed_ids}
-    name_to_func = {
-        "gates_routed": gates_routed,
-        "criticality": criticality_fast,
-        "dependent": dependent,
-    }
-
-    reward_func = name_to_func[reward_name]
+    # Every reward reads precomputed per-gate values from crit_dict, so none
+    # needs the gates left after a step
+    best_remaining_gates = new_remaining_gates = gates
+    reward_func = REWARD_FUNCTIONS[reward_name]
     orders_tried_count = 1
     if len(executable) < 2:
         return best_step, 1  # type: ignore
@@ -295,33 +430,54 @@ def best_realizable_set_found(
         # print(sample_size, len(orders))
 
         orders_to_explore = orders[:sample_size]
+        if orders_to_explore:
+            best_reward = reward_func(best_step, best_remaining_gates, crit_dict)  # type: ignore
+        if order_pool is not None and len(orders_to_explore) >= MIN_PARALLEL_ORDERS:
+            orders = [list(cnots) + list(ts) for cnots, ts in orders_to_explore]
+            # Rewards only read the values of the executable gates
+            step_crit_dict = {id: crit_dict[id] for id in executable if id in crit_dict}
+            chunk_size = math.ceil(len(orders) / order_workers)
+            starts = range(0, len(orders), chunk_size)
+            futures = [
+                order_pool.submit(
+                    _best_of_orders,
+                    orders[start : start + chunk_size],
+                    executable,
+                    arch,
+                    mapping,
+                    take_first_ms,
+                    reward_name,
+                    step_crit_dict,
+                )
+                for start in starts
+            ]
+            chunk_best = [
+                (reward, start + index, step)
+                for start, future in zip(starts, futures)
+                for reward, index, step in [future.result()]
+            ]
+            reward, _, step = min(chunk_best, key=lambda best: (-best[0], best[1]))
+            if reward > best_reward:
+                best_step = step
+            return best_step, orders_tried_count + len(orders)  # type: ignore
         for cnot_order, t_order in orders_to_explore:
+            if deadline.expired():
+                break
             order = list(cnot_order) + list(t_order)
-            new_step = try_order(
-                order,
-                executable,
-                grid_len,
-                grid_height,
-                msf_faces,
-                mapping,
-                take_first_ms,
-            )
+            new_step = router.route(order)
             orders_tried_count += 1
-            routed_ids = [x[0] for x in new_step]
-            new_remaining_gates = {
-                k: v for k, v in gates.items() if k not in routed_ids
-            }
-            # print(f"considering step {new_step}", f"reward: {reward_func(new_step, new_remaining_gates)}")
-            if reward_func(new_step, new_remaining_gates, crit_dict) > reward_func(
-                best_step,  # type: ignore
-                best_remaining_gates,
-                crit_dict,
-            ):
+            new_reward = reward_func(new_step, new_remaining_gates, crit_dict)
+            # print(f"considering step {new_step}", f"reward: {new_reward}")
+            if new_reward > best_reward:
                 best_step = new_step
+                best_reward = new_reward
         return best_step, orders_tried_count  # type: ignore
 
     else:
-        while temperature > termination_temp:
+        if temperature > termination_temp:
+            best_reward = reward_func(best_step, best_remaining_gates, crit_dict)  # type: ignore
+            current_reward = best_reward
+        while temperature > termination_temp and not deadline.expired():
             new_order = current_order.copy()  # type: ignore
             cnots, ts = new_order[: len(cnot_indices)], new_order[len(cnot_indices) :]
             if len(cnots) > 1:
@@ -335,41 +491,39 @@ def best_realizable_set_found(
                 )
                 ts[ind1], ts[ind2] = ts[ind2], ts[ind1]
             new_order = cnots + ts
-            new_step = try_order(
-                new_order,
-                executable,
-                grid_len,
-                grid_height,
-                msf_faces,
-                mapping,
-                take_first_ms,
-            )
+            new_step = router.route(new_order)
             orders_tried_count += 1
-            routed_ids = [x[0] for x in new_step]
-            new_remaining_gates = {
-                k: v for k, v in gates.items() if k not in routed_ids
-            }
-            delta_curr = reward_func(
-                current_step,  # type: ignore
-                best_remaining_gates,
-                crit_dict,
-            ) - reward_func(new_step, new_remaining_gates, crit_dict)
-            delta_best = reward_func(
-                best_step,  # type: ignore
-                best_remaining_gates,
-                crit_dict,
-            ) - reward_func(new_step, new_remaining_gates, crit_dict)
+            new_reward = reward_func(new_step, new_remaining_gates, crit_dict)
+            delta_curr = current_reward - new_reward
+            delta_best = best_reward - new_reward
             if delta_curr < 0 or np.random.rand() < np.exp(-delta_curr / temperature):
                 current_order = new_order
                 current_step = new_step
+                current_reward = new_reward
             if delta_best < 0:
                 # print(len(best_step))
                 best_order = new_order
                 best_step = new_step
+                best_reward = new_reward
             temperature *= 1 - cooling_rate
         return best_step, orders_tried_count  # type: ignore
 
 
+def greedy_step(
+    executable, geometry: ArchitectureGeometry, mapping, crit_dict, take_first_ms
+):
+    """
+    Routes a timestep in a single order: the CNOTs, then the T gates, each
+    by decreasing criticality.
+    """
+    items = list(executable.items())
+    order = sorted(
+        range(len(items)),
+        key=lambda i: (len(items[i][1]) == 1, -crit_dict[items[i][0]]),
+    )
+    return try_order(order, executable, geometry, mapping, take_first_ms)
+
+
 def sim_anneal_route(
     gates,
     arch,
@@ -381,7 +535,33 @@ def sim_anneal_route(
     initial_order="random",
     reward_name="criticality",
     take_first_ms=True,
+    order_workers=1,
+    deadline: Deadline | None = None,
+    greedy=False,
+    reward_table=None,
 ):
+    """
+    With `order_workers` > 1, exhaustive timesteps route their candidate
+    orders in a pool of that many processes. The routes are the same.
+
+    With `greedy` every timestep is routed once with greedy_step, ignoring
+    the annealing parameters and the reward. Skipping the order search makes
+    routing several times faster. The step count is no longer the best of a
+    search, and a mapping's greedy and full step counts can differ by
+    several percent either way (scripts/benchmarks/greedy_benchmark.py
+    measures both), which is fine for screening mappings before routing
+    them in full.
+
+    Once `deadline` expires routing stops after the current timestep and
+    the steps so far are returned, so not every gate may be routed. Routing
+    also stops, without adding the empty timestep, once a timestep routes no
+    gates, since the same gates would stay blocked until the deadline.
+
+    `reward_table` is the circuit's build_reward_table for `reward_name`
+    (for "criticality" when greedy) if the caller already built it.
+    """
+    if deadline is None:
+        deadline = Deadline()
     timesteps = []
     grid_len = arch["width"]
     grid_height = arch["height"]
@@ -389,33 +569,50 @@ def sim_anneal_route(
     # mapping = {q: p for (q, p) in mapping} Removed conversion, doing it earlier
     gates_id_table = {i: gate for i, gate in enumerate(gates)}
     crit_dict = {}
-    if temperature > termination_temp:
-        crit_dict = build_crit_dict_fast(gates_id_table)
+    if reward_table is not None:
+        crit_dict = reward_table
+    elif greedy:
+        crit_dict = build_crit_dict_linear(gates_id_table)
+    elif temperature > termination_temp:
+        crit_dict = build_reward_table(reward_name, gates_id_table)
+    geometry = geometry_for_arch(arch)
     tried_steps = 0
-    while len(gates_id_table) != 0:
-        # print(len(gates_id_table))
-        executable, remaining = executable_subset(gates_id_table)
-        step, tried = best_realizable_set_found(
-            gates_id_table,
-            executable,
-            arch,
-            mapping,
-            order_fraction=order_fraction,
-            crit_dict=crit_dict,
-            temperature=temperature,
-            cooling_rate=cooling_rate,
-            termination_temp=termination_temp,
-            initial_order=initial_order,
-            reward_name=reward_name,
-            take_first_ms=take_first_ms,
-        )
-        tried_steps += tried
-        timesteps.append(step)
-        routed_ids = [x[0] for x in step]
-        not_executed = {
-            id: gates_id_table[id] for id in executable if id not in routed_ids
-        }
-        gates_id_table = {**not_executed, **remaining}
+    scheduler = FrontLayerScheduler(gates_id_table)
+    with (
+        ProcessPoolExecutor(max_workers=order_workers)
+        if order_workers > 1
+        else nullcontext()
+    ) as order_pool:
+        while len(scheduler) != 0 and not deadline.expired():
+            executable = scheduler.executable()
+            if greedy:
+                step = greedy_step(
+                    executable, geometry, mapping, crit_dict, take_first_ms
+                )
+                tried = 1
+            else:
+                step, tried = best_realizable_set_found(
+                    scheduler.unrouted,
+                    executable,
+                    arch,
+                    mapping,
+                    order_fraction=order_fraction,
+                    crit_dict=crit_dict,
+                    temperature=temperature,
+                    cooling_rate=cooling_rate,
+                    termination_temp=termination_temp,
+                    initial_order=initial_order,
+                    reward_name=reward_name,
+                    take_first_ms=take_first_ms,
+                    order_pool=order_pool,
+                    order_workers=order_workers,
+                    deadline=deadline,
+                )
+            tried_steps += tried
+            if not step:
+                break
+            timesteps.append(step)
+            scheduler.retire(x[0] for x in step)
     # print(f'routing orders tried {tried_steps}')
     return timesteps, tried_steps
 
@@ -0,0 +1,139 @@
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+
+
+class FrontLayerScheduler:
+    """
+    Executable front of a circuit that is being routed gate by gate.
+
+    Every qubit keeps a queue of the unrouted gates on it and every gate
+    counts the qubits on which it still waits for an earlier gate. A gate
+    is in the front once it heads all of its queues, so retiring a routed
+    gate only touches the queues of its own qubits.
+
+    The front matches calling executable_subset on the unrouted gates after
+    every step, including its order: gates left in the front keep their
+    place and newly unblocked gates are appended in circuit order.
+    """
+
+    def __init__(self, gates: dict) -> None:
+        self.gates = gates
+        self._position = {id: i for i, id in enumerate(gates)}
+        self._queues: dict[int, deque] = {}
+        self._waiting: dict[int, int] = {}
+        self.front: dict = {}
+        for id, gate in gates.items():
+            waiting = 0
+            for q in dict.fromkeys(gate):
+                queue = self._queues.setdefault(q, deque())
+                waiting += bool(queue)
+                queue.append(id)
+            if waiting:
+                self._waiting[id] = waiting
+            else:
+                self.front[id] = gate
+        self.routed: set = set()
+        # Front gates that stayed unrouted through the last retire
+        self.carried: dict = {}
+        self.unrouted = UnroutedGates(self)
+
+    def __len__(self) -> int:
+        return len(self.gates) - len(self.routed)
+
+    def executable(self) -> dict:
+        return dict(self.front)
+
+    def retire(self, ids: Iterable[int]) -> None:
+        """
+        Removes routed gates from the front and promotes the gates that
+        no longer wait for anything.
+        """
+        promoted = []
+        for id in ids:
+            gate = self.front.pop(id)
+            self.routed.add(id)
+            for q in dict.fromkeys(gate):
+                queue = self._queues[q]
+                queue.popleft()
+                if queue:
+                    next_id = queue[0]
+                    self._waiting[next_id] -= 1
+                    if self._waiting[next_id] == 0:
+                        del self._waiting[next_id]
+                        promoted.append(next_id)
+        self.carried = dict.fromkeys(self.front)
+        promoted.sort(key=self._position.__getitem__)
+        for id in promoted:
+            self.front[id] = self.gates[id]
+
+
+class UnroutedGates(Mapping):
+    """
+    Read-only view of a scheduler's unrouted gates. They are listed in the
+    order of the gate table sim_anneal_route used to rebuild every step:
+    gates carried over in the front first, then the rest in circuit order.
+    Nothing is copied until the view is iterated.
+    """
+
+    def __init__(self, scheduler: FrontLayerScheduler) -> None:
+        self.scheduler = scheduler
+
+    def __getitem__(self, id):
+        if id in self.scheduler.routed:
+            raise KeyError(id)
+        return self.scheduler.gates[id]
+
+    def __contains__(self, id) -> bool:
+        return id in self.scheduler.gates and id not in self.scheduler.routed
+
+    def __iter__(self) -> Iterator:
+        carried = self.scheduler.carried
+        routed = self.scheduler.routed
+        for id in carried:
+            if id not in routed:
+                yield id
+        for id in self.scheduler.gates:
+            if id not in carried and id not in routed:
+                yield id
+
+    def __len__(self) -> int:
+        return len(self.scheduler)
+
+
+class DependencyDAG:
+    """
+    Per-gate dependency summaries of a circuit, from one reverse pass.
+
+    A gate's dependents are the gates that transitively share a qubit with
+    it later in the circuit. Walking backwards, every qubit keeps the
+    dependents of the next gate on it as a bitset (a Python int with one bit
+    per gate), so a gate's bitset is the union of its successors' bitsets
+    and only one bitset per qubit is alive at a time.
+
+    `dependent_counts` is the number of dependents of each gate, itself
+    included. `chain_lengths` is the number of gates on the longest chain
+    of dependents starting at each gate.
+    """
+
+    def __init__(self, gates: dict) -> None:
+        # Dependents of the next gate on each qubit, itself included
+        next_dependents: dict[int, int] = {}
+        next_chain: dict[int, int] = {}
+        dependent_counts = {}
+        chain_lengths = {}
+        ids = list(gates)
+        for position in reversed(range(len(ids))):
+            id = ids[position]
+            qubits = dict.fromkeys(gates[id])
+            dependents = 1 << position
+            chain = 0
+            for q in qubits:
+                dependents |= next_dependents.get(q, 0)
+                chain = max(chain, next_chain.get(q, 0))
+            for q in qubits:
+                next_dependents[q] = dependents
+                next_chain[q] = chain + 1
+            dependent_counts[id] = dependents.bit_count()
+            chain_lengths[id] = chain + 1
+        self.dependent_counts = dependent_counts
+        self.chain_lengths = chain_lengths
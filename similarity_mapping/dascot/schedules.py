@@ -0,0 +1,127 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class GeometricSchedule:
+    """
+    Cools the temperature by `cooling_rate` every step until it reaches
+    `termination_temp`. With a `stall_window` the schedule also finishes
+    once the best cost has not improved for that many steps, or once fewer
+    than `min_acceptance` of the swaps in the last window were accepted.
+    """
+
+    def __init__(
+        self,
+        initial_temp: float,
+        cooling_rate: float,
+        termination_temp: float,
+        stall_window: int | None = None,
+        min_acceptance: float = 0.0,
+    ) -> None:
+        self.initial_temp = initial_temp
+        self.cooling_rate = cooling_rate
+        self.termination_temp = termination_temp
+        self.stall_window = stall_window
+        self.min_acceptance = min_acceptance
+        self.temperature = initial_temp
+        self.steps = 0
+        self._window_start = 0
+        self._last_improvement = 0
+        # Steps at which a swap was accepted, within the last window
+        self._acceptances: deque[int] = deque()
+
+    def step_bound(self) -> int | None:
+        """
+        Upper bound on the number of steps before the temperature reaches the
+        termination temperature, or None if the schedule never cools.
+        """
+        if self.temperature <= self.termination_temp:
+            return 0
+        if self.cooling_rate <= 0:
+            return None
+        return math.ceil(
+            math.log(self.termination_temp / self.temperature)
+            / math.log(1 - self.cooling_rate)
+        )
+
+    def temperatures(self, size: int) -> np.ndarray:
+        """
+        Temperatures of the next `size` steps, cut at the termination temperature.
+        """
+        temperatures = self.temperature * (1 - self.cooling_rate) ** np.arange(size)
+        return temperatures[temperatures > self.termination_temp]
+
+    def update(self, taken: int, accepted: bool, improved: bool) -> None:
+        """
+        Advances the schedule by `taken` steps, the last of which was
+        accepted and/or improved the best cost as flagged.
+        """
+        self.steps += taken
+        self.temperature *= (1 - self.cooling_rate) ** taken
+        if accepted:
+            self._acceptances.append(self.steps)
+        if improved:
+            self._last_improvement = self.steps
+        if self.stall_window is not None:
+            while (
+                self._acceptances
+                and self._acceptances[0] <= self.steps - self.stall_window
+            ):
+                self._acceptances.popleft()
+
+    def stalled(self) -> bool:
+        if (
+            self.stall_window is None
+            or self.steps - self._window_start < self.stall_window
+        ):
+            return False
+        return (
+            self.steps - self._last_improvement >= self.stall_window
+            or len(self._acceptances) < self.min_acceptance * self.stall_window
+        )
+
+    def finished(self) -> bool:
+        return self.temperature <= self.termination_temp or self.stalled()
+
+
+class ReheatingSchedule(GeometricSchedule):
+    """
+    Geometric schedule that reheats instead of stopping when it stalls.
+    The n-th reheat restarts from `initial_temp * reheat_factor ** n`;
+    after `max_reheats` reheats a stall finishes the schedule.
+    """
+
+    def __init__(
+        self,
+        initial_temp: float,
+        cooling_rate: float,
+        termination_temp: float,
+        stall_window: int | None = 1000,
+        min_acceptance: float = 0.0,
+        reheat_factor: float = 0.5,
+        max_reheats: int = 3,
+    ) -> None:
+        super().__init__(
+            initial_temp, cooling_rate, termination_temp, stall_window, min_acceptance
+        )
+        self.reheat_factor = reheat_factor
+        self.max_reheats = max_reheats
+        self.reheats = 0
+
+    def step_bound(self) -> int | None:
+        # Reheats restart the cooling, so only the final run is bounded
+        return None if self.reheats < self.max_reheats else super().step_bound()
+
+    def update(self, taken: int, accepted: bool, improved: bool) -> None:
+        super().update(taken, accepted, improved)
+        if self.reheats < self.max_reheats and self.stalled():
+            self.reheats += 1
+            self.temperature = max(
+                self.initial_temp * self.reheat_factor**self.reheats,
+                self.temperature,
+            )
+            self._window_start = self.steps
+            self._last_improvement = self.steps
+            self._acceptances.clear()
@@ -0,0 +1,111 @@
+import numpy as np
+
+from .architecture import geometry_for_arch
+from .layering import as_compact_phased_graph
+
+
+class SurrogateEngine:
+    """
+    Cheap stand-in for the overlap count used to pre-anneal mappings.
+
+    The cost is the total Manhattan length of all CNOT interactions plus,
+    for every T gate, the distance from its qubit to the nearest magic state.
+    Interactions are kept as weighted per-qubit neighbour lists, so the
+    delta of a swap only looks at the neighbours of the two swapped qubits.
+    Exposes the same swap_deltas/apply_swap interface as OverlapEngine.
+    """
+
+    def __init__(self, mapping: dict, phased_graphs, arch: dict) -> None:
+        geometry = geometry_for_arch(arch)
+        self.width = geometry.width
+        self.nearest_magic_state_distance = geometry.nearest_magic_state_distance
+
+        graph = as_compact_phased_graph(phased_graphs)
+        controls = graph.controls.tolist()
+        targets = graph.targets.tolist()
+        size = max([*mapping.keys(), *controls, *targets], default=0) + 1
+        self.coords = np.zeros((size, 2), dtype=np.int64)
+        for q, (x, y) in mapping.items():
+            self.coords[q] = (x, y)
+
+        weights: dict[int, dict[int, int]] = {}
+        t_counts = np.zeros(size, dtype=np.int64)
+        for c, t in zip(controls, targets, strict=True):
+            if t in mapping:
+                weights.setdefault(c, {})[t] = weights.get(c, {}).get(t, 0) + 1
+                weights.setdefault(t, {})[c] = weights.get(t, {}).get(c, 0) + 1
+            else:
+                t_counts[c] += 1
+        self.t_counts = t_counts
+        self.neighbors = {
+            q: np.fromiter(w.keys(), dtype=np.int64) for q, w in weights.items()
+        }
+        self.weights = {
+            q: np.fromiter(w.values(), dtype=np.int64) for q, w in weights.items()
+        }
+        self._no_neighbors = np.zeros(0, dtype=np.int64)
+
+        qubits = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+        interaction_length = sum(
+            int(
+                (
+                    self.weights[q]
+                    * np.abs(self.coords[self.neighbors[q]] - self.coords[q]).sum(
+                        axis=1
+                    )
+                ).sum()
+            )
+            for q in self.neighbors
+        )
+        self.cost = interaction_length // 2 + int(
+            (
+                self.t_counts[qubits] * self._magic_state_distances(self.coords[qubits])
+            ).sum()
+        )
+
+    def _magic_state_distances(self, points: np.ndarray) -> np.ndarray:
+        return self.nearest_magic_state_distance[
+            points[:, 1] * self.width + points[:, 0]
+        ]
+
+    def swap_deltas(self, qubits1: np.ndarray, qubits2: np.ndarray) -> np.ndarray:
+        """
+        Cost change of swapping qubits1[k] with qubits2[k] for every k.
+        """
+        qubits1 = np.asarray(qubits1, dtype=np.int64)
+        qubits2 = np.asarray(qubits2, dtype=np.int64)
+        num_candidates = len(qubits1)
+        if num_candidates == 0:
+            return np.zeros(0, dtype=np.int64)
+        neighbors, weights = [], []
+        for qubit1, qubit2 in zip(qubits1.tolist(), qubits2.tolist(), strict=True):
+            neighbors.append(self.neighbors.get(qubit1, self._no_neighbors))
+            neighbors.append(self.neighbors.get(qubit2, self._no_neighbors))
+            weights.append(self.weights.get(qubit1, self._no_neighbors))
+            weights.append(self.weights.get(qubit2, self._no_neighbors))
+        lengths = np.array([len(n) for n in neighbors], dtype=np.int64)
+        neighbor = np.concatenate(neighbors)
+        weight = np.concatenate(weights)
+        part_index = np.repeat(np.arange(2 * num_candidates), lengths)
+        candidate = part_index >> 1
+        moved = np.where(part_index & 1, qubits2[candidate], qubits1[candidate])
+        other = np.where(part_index & 1, qubits1[candidate], qubits2[candidate])
+        # The distance between the two swapped qubits does not change
+        weight = np.where(neighbor == other, 0, weight)
+        neighbor_xy = self.coords[neighbor]
+        change = weight * (
+            np.abs(self.coords[other] - neighbor_xy).sum(axis=1)
+            - np.abs(self.coords[moved] - neighbor_xy).sum(axis=1)
+        )
+        deltas = np.bincount(candidate, weights=change, minlength=num_candidates)
+
+        distance1 = self._magic_state_distances(self.coords[qubits1])
+        distance2 = self._magic_state_distances(self.coords[qubits2])
+        deltas += (self.t_counts[qubits1] - self.t_counts[qubits2]) * (
+            distance2 - distance1
+        )
+        return np.rint(deltas).astype(np.int64)
+
+    def apply_swap(self, qubit1: int, qubit2: int, delta: int) -> None:
+        self.coords[[qubit1, qubit2]] = self.coords[[qubit2, qubit1]]
+        self.cost += delta
@@ -1,28 +1,197 @@
 from similarity_mapping.dascot.dascot import (
-    TimeoutException,
-    timeout_handler,
     extract_qubits_from_gates,
     extract_gates_from_file,
 )
-from similarity_mapping.dascot.architecture import square_sparse_layout, compact_layout
-from similarity_mapping.dascot.phased_graph import build_phased_map
-from similarity_mapping.dascot.sarouting import sim_anneal_route
+from similarity_mapping.dascot.architecture import (
+    square_sparse_layout,
+    compact_layout,
+    geometry_for_arch,
+)
+from similarity_mapping.dascot.layering import (
+    CompactPhasedGraph,
+    build_compact_phased_graph,
+    circuit_depth,
+    gate_layers,
+)
+from similarity_mapping.dascot.overlaps import count_overlaps_batch
+from similarity_mapping.dascot.phased_graph import (
+    WARM_START_TEMP_FACTOR,
+    AnnealStats,
+    build_phased_map,
+)
+from similarity_mapping.dascot.schedules import GeometricSchedule
+from similarity_mapping.dascot.deadline import Deadline
+from similarity_mapping.dascot.sarouting import (
+    build_crit_dict_linear,
+    sim_anneal_route,
+)
 from .types import (
     Mapping,
+    MappingChain,
+    ParallelMapping,
     Routing,
+    ScoredMapping,
+    RoutingRun,
     Circuit,
-    qasm_from_gates,
+    CircuitProfile,
     parse_route_unsafe,
     Architectures,
     parse_architecture_safe,
 )
-import signal
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Callable
+import numpy as np
+import math
+import random
+import time
+
+
+def _seed_all(seed: int) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _map_chain(
+    qubits: set[int],
+    gates: list[list[int]],
+    arch: dict,
+    anneal_params: list[float],
+    timeout: float,
+    seed: int,
+    initial_mapping: dict | None = None,
+    max_steps: int | None = None,
+    phased_graph: CompactPhasedGraph | None = None,
+    schedule: Callable[..., GeometricSchedule] = GeometricSchedule,
+    surrogate_timeout: float = 0,
+) -> tuple[dict[int, int], int, AnnealStats]:
+    """
+    Runs one annealing chain, seeded so that it is reproducible in a worker process.
+    """
+    _seed_all(seed)
+    stats = AnnealStats()
+    phased_map, cost = build_phased_map(
+        qubits,
+        gates,
+        arch,
+        *anneal_params,
+        timeout,  # type: ignore
+        initial_mapping=initial_mapping,
+        max_steps=max_steps,
+        stats=stats,
+        # Callers pass the exact temperatures they want for their own mappings
+        warm_start_temp_factor=(
+            WARM_START_TEMP_FACTOR if initial_mapping is None else 1
+        ),
+        phased_graph=phased_graph,
+        schedule=schedule,
+        surrogate_timeout=surrogate_timeout,
+    )
+    return {q: p for (q, p) in phased_map}, cost, stats
+
+
+def _route_steps(
+    gates: list[list[int]],
+    arch: dict,
+    map_dict: dict[int, int],
+    timeout: float,
+    order_workers: int = 1,
+    greedy: bool = False,
+    crit_dict: dict[int, int] | None = None,
+) -> tuple[list, bool]:
+    """
+    Routes a mapping within `timeout` seconds, or without a time limit if
+    `timeout` is 0 or less. Returns the steps and whether routing stopped
+    before every gate was routed, because the timeout ran out or a gate
+    could not be routed.
+    """
+    steps, _ = sim_anneal_route(
+        gates,
+        arch,
+        map_dict,
+        10,
+        0.1,
+        0.1,
+        reward_name="criticality",
+        order_fraction=1,
+        take_first_ms=False,
+        order_workers=order_workers,
+        deadline=Deadline(timeout),
+        greedy=greedy,
+        reward_table=crit_dict,
+    )
+    return steps, sum(len(step) for step in steps) < len(gates)
+
+
+def _exchange_replicas(
+    states: list,
+    energies: list[int],
+    temperatures: list[float],
+    offset: int,
+    rng: random.Random,
+) -> None:
+    """
+    Exchanges the states of the neighbouring replica pairs starting at
+    `offset` with the Metropolis criterion of parallel tempering.
+    """
+    for i in range(offset, len(states) - 1, 2):
+        exponent = (1 / temperatures[i] - 1 / temperatures[i + 1]) * (
+            energies[i] - energies[i + 1]
+        )
+        if exponent >= 0 or rng.random() < math.exp(exponent):
+            states[i], states[i + 1] = states[i + 1], states[i]
+            energies[i], energies[i + 1] = energies[i + 1], energies[i]
+
+
+# Routing problem of a route_many worker, sent once when the worker starts
+_route_worker_problem: tuple = ()
+
+
+def _init_route_worker(
+    gates: list[list[int]],
+    arch: dict,
+    map_dict: dict[int, int],
+    timeout: float,
+    greedy: bool,
+    crit_dict: dict[int, int] | None,
+) -> None:
+    global _route_worker_problem
+    _route_worker_problem = (gates, arch, map_dict, timeout, 1, greedy, crit_dict)
+
+
+def _route_run(seed: int) -> tuple[list, bool, float]:
+    """
+    Routes the worker's mapping once, seeded so that it is reproducible.
+    """
+    _seed_all(seed)
+    start = time.perf_counter()
+    steps, timed_out = _route_steps(*_route_worker_problem)
+    return steps, timed_out, time.perf_counter() - start
 
 
 class Dascot:
-    def __init__(self, mapping_timeout_sec: int, routing_timeout_sec: int):
+    def __init__(
+        self,
+        mapping_timeout_sec: int,
+        routing_timeout_sec: int,
+        surrogate_timeout_sec: int = 0,
+        schedule: Callable[..., GeometricSchedule] = GeometricSchedule,
+        order_workers: int = 1,
+    ):
+        """
+        A positive `surrogate_timeout_sec` makes `map` pre-anneal on the cheap
+        surrogate cost for that long before refining on the overlap count.
+        `schedule` builds the annealing schedule of `map` and `bootstrapped_map`
+        from the parameters returned by `anneal_params`, e.g. ReheatingSchedule.
+        `order_workers` > 1 makes `route` try the gate orders of large
+        timesteps in that many processes, with the same result.
+        A routing timeout of 0 or less sets no time limit, while a mapping
+        timeout of 0 or less returns the initial mapping without annealing.
+        """
         self.map_timeout_sec = mapping_timeout_sec
         self.route_timeout_sec = routing_timeout_sec
+        self.surrogate_timeout_sec = surrogate_timeout_sec
+        self.schedule = schedule
+        self.order_workers = order_workers
 
     def extract_circuit_from_file(
         self, file_path: str, arch_type: Architectures
@@ -36,85 +205,426 @@ class Dascot:
             arch = compact_layout(len(qubits), magic_states="all_sides")
         return Circuit(gates=gates, arch=parse_architecture_safe(arch))
 
-    def bootstrapped_map(self, mapping: Mapping) -> Mapping:
-        qubits = extract_qubits_from_gates(mapping.gates)
-        qcircuit = qasm_from_gates(mapping.gates, max(qubits) + 1)
+    def anneal_params(
+        self, gates: list[list[int]], depth: int | None = None
+    ) -> list[float]:
+        """
+        Initial temperature, cooling rate and termination temperature of the
+        mapping annealer, scaled by the depth of the circuit. An empty
+        circuit is scaled as if it had depth 1.
+        """
         sim_anneal_params = [100, 0.1, 0.1]
-        depth = qcircuit.depth(
-            filter_function=lambda x: x[0].name in ["cx", "t", "tdg"]
-        )
-        scaled_sim_anneal_params = [
+        if depth is None:
+            depth = circuit_depth(gates)
+        depth = max(depth, 1)
+        return [
             sim_anneal_params[0],
             sim_anneal_params[1] / depth,
             10 * sim_anneal_params[2] / depth,
         ]
+
+    def profile(self, gates: list[list[int]]) -> CircuitProfile:
+        """
+        Preprocesses a circuit once for `map`, `bootstrapped_map`, `route`
+        and the other calls that take a `profile`, instead of on every call.
+        """
+        layers = gate_layers(gates)
+        depth = max(layers, default=-1) + 1
+        qubits = extract_qubits_from_gates(gates)
+        num_qubits = max(qubits, default=-1) + 1
+        return CircuitProfile(
+            num_gates=len(gates),
+            qubits=qubits,
+            layers=np.array(layers, dtype=np.int32),
+            depth=depth,
+            phased_graph=build_compact_phased_graph(gates, num_qubits, include_t=True),
+            crit_dict=build_crit_dict_linear(dict(enumerate(gates))),
+            anneal_params=self.anneal_params(gates, depth),
+        )
+
+    def bootstrapped_map(
+        self,
+        mapping: Mapping,
+        progress: Callable[[Mapping], None] | None = None,
+        profile: CircuitProfile | None = None,
+    ) -> Mapping:
+        """
+        Anneals starting from `mapping`, at a lower temperature than `map`.
+        `profile` is the circuit's profile, see `profile`.
+        """
+        assert profile is None or profile.num_gates == len(mapping.gates)
+        if profile is None:
+            qubits = extract_qubits_from_gates(mapping.gates)
+            scaled_sim_anneal_params = self.anneal_params(mapping.gates)
+        else:
+            qubits = profile.qubits
+            scaled_sim_anneal_params = profile.anneal_params
         initial_mapping = {int(k): v for k, v in mapping.map.items()}
         phased_map, _ = build_phased_map(
             qubits,
-            qcircuit,
+            mapping.gates,
             mapping.arch.__dict__,
+            *scaled_sim_anneal_params,
             initial_mapping=initial_mapping,  # Pass in the mapping as the initial mapping
             include_t=True,
             timeout=self.map_timeout_sec,
-            *scaled_sim_anneal_params,
+            schedule=self.schedule,
+            progress=self._progress_reporter(mapping.arch, mapping.gates, progress),
+            phased_graph=None if profile is None else profile.phased_graph,
         )
         # Turn the phased map into a dict
         map_dict = {q: p for (q, p) in phased_map}  # Taken from sarouting.py
         return Mapping(arch=mapping.arch, gates=mapping.gates, map=map_dict)  # type: ignore
 
-    def map(self, circuit: Circuit) -> Mapping:
-        qubits = extract_qubits_from_gates(circuit.gates)
-        qcircuit = qasm_from_gates(circuit.gates, max(qubits) + 1)
-        sim_anneal_params = [100, 0.1, 0.1]
-        depth = qcircuit.depth(
-            filter_function=lambda x: x[0].name in ["cx", "t", "tdg"]
+    def _progress_reporter(
+        self, arch, gates: list[list[int]], progress: Callable[[Mapping], None] | None
+    ) -> Callable[[list, int], None] | None:
+        if progress is None:
+            return None
+        return lambda phased_map, _: progress(
+            Mapping(arch=arch, gates=gates, map={q: p for (q, p) in phased_map})
         )
-        scaled_sim_anneal_params = [
-            sim_anneal_params[0],
-            sim_anneal_params[1] / depth,
-            10 * sim_anneal_params[2] / depth,
-        ]
+
+    def map(
+        self,
+        circuit: Circuit,
+        progress: Callable[[Mapping], None] | None = None,
+        profile: CircuitProfile | None = None,
+    ) -> Mapping:
+        """
+        `progress` is called with every new incumbent mapping, so a caller
+        can stop waiting and use the best mapping found so far.
+        `profile` is the circuit's profile, see `profile`.
+        """
+        assert profile is None or profile.num_gates == len(circuit.gates)
+        if profile is None:
+            qubits = extract_qubits_from_gates(circuit.gates)
+            scaled_sim_anneal_params = self.anneal_params(circuit.gates)
+        else:
+            qubits = profile.qubits
+            scaled_sim_anneal_params = profile.anneal_params
         phased_map, _ = build_phased_map(
             qubits,
-            qcircuit,
+            circuit.gates,
             circuit.arch.__dict__,
+            *scaled_sim_anneal_params,
             include_t=True,
             timeout=self.map_timeout_sec,
-            *scaled_sim_anneal_params,
+            surrogate_timeout=self.surrogate_timeout_sec,
+            schedule=self.schedule,
+            progress=self._progress_reporter(circuit.arch, circuit.gates, progress),
+            phased_graph=None if profile is None else profile.phased_graph,
         )
         # Turn the phased map into a dict
         map_dict = {q: p for (q, p) in phased_map}  # Taken from sarouting.py
         return Mapping(arch=circuit.arch, gates=circuit.gates, map=map_dict)  # type: ignore
 
-    def route(self, mapping: Mapping) -> Routing | None:
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(self.route_timeout_sec)
-        steps: list | None = None
-        map_dict = {int(k): v for k, v in mapping.map.items()}
+    def map_parallel(
+        self,
+        circuit: Circuit,
+        chains: int,
+        workers: int | None = None,
+        seeds: list[int] | None = None,
+        tempering: bool = False,
+        exchange_steps: int = 100,
+        profile: CircuitProfile | None = None,
+    ) -> ParallelMapping:
+        """
+        Runs independent annealing chains in a process pool and keeps the
+        mapping with the fewest overlaps.
+        With tempering, every chain instead anneals at a fixed temperature
+        between the initial and termination temperatures, and neighbouring
+        chains exchange states every `exchange_steps` steps (parallel tempering).
+        Independent chains use `schedule` and `surrogate_timeout_sec` like
+        `map`. Tempering chains anneal at fixed temperatures, so it raises
+        ValueError if either is set.
 
-        try:
-            steps, _ = sim_anneal_route(
-                mapping.gates,
-                mapping.arch.__dict__,
-                map_dict,
-                reward_name="criticality",
-                order_fraction=1,
-                take_first_ms=False,
-                *[10, 0.1, 0.1],
+        Args:
+            circuit (Circuit): the circuit to be mapped
+            chains (int): number of chains
+            workers (int | None): size of the process pool, defaults to the cpu count
+            seeds (list[int] | None): one seed per chain, defaults to 0..chains-1
+            profile (CircuitProfile | None): the circuit's profile, see `profile`
+
+        Returns:
+            ParallelMapping: the best mapping and the stats of every chain
+        """
+        seeds = list(range(chains)) if seeds is None else seeds
+        assert len(seeds) == chains
+        if tempering and (
+            self.schedule is not GeometricSchedule or self.surrogate_timeout_sec > 0
+        ):
+            raise ValueError(
+                "Parallel tempering anneals at fixed temperatures and does not"
+                " take a schedule or surrogate timeout"
+            )
+        assert profile is None or profile.num_gates == len(circuit.gates)
+        arch = circuit.arch.__dict__
+        if profile is None:
+            qubits = extract_qubits_from_gates(circuit.gates)
+            params = self.anneal_params(circuit.gates)
+            # Built once here instead of in every chain and exchange round
+            phased_graph = build_compact_phased_graph(
+                circuit.gates, max(qubits) + 1, include_t=True
             )
-            # Parse routes
-            routes = [parse_route_unsafe(step) for step in steps]
-        except TimeoutException:
+        else:
+            qubits = profile.qubits
+            params = profile.anneal_params
+            phased_graph = profile.phased_graph
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if tempering:
+                best_map, chain_stats = self._parallel_tempering(
+                    pool,
+                    qubits,
+                    circuit.gates,
+                    arch,
+                    params,
+                    seeds,
+                    exchange_steps,
+                    phased_graph,
+                )
+            else:
+                futures = [
+                    pool.submit(
+                        _map_chain,
+                        qubits,
+                        circuit.gates,
+                        arch,
+                        params,
+                        self.map_timeout_sec,
+                        seed,
+                        phased_graph=phased_graph,
+                        schedule=self.schedule,
+                        surrogate_timeout=self.surrogate_timeout_sec,
+                    )
+                    for seed in seeds
+                ]
+                results = [future.result() for future in futures]
+                best_map = min(results, key=lambda result: result[1])[0]
+                chain_stats = [
+                    MappingChain(seed=seed, overlaps=cost, stats=stats)
+                    for seed, (_, cost, stats) in zip(seeds, results, strict=True)
+                ]
+        mapping = Mapping(arch=circuit.arch, gates=circuit.gates, map=best_map)  # type: ignore
+        return ParallelMapping(mapping=mapping, chains=chain_stats)
+
+    def _parallel_tempering(
+        self,
+        pool: ProcessPoolExecutor,
+        qubits: set[int],
+        gates: list[list[int]],
+        arch: dict,
+        params: list[float],
+        seeds: list[int],
+        exchange_steps: int,
+        phased_graph: CompactPhasedGraph | None = None,
+    ) -> tuple[dict[int, int], list[MappingChain]]:
+        """
+        A chain's stop reason is that of its last round, or "timeout" or
+        "zero_overlaps" if the run ended between rounds for that reason.
+        """
+        initial_temp, cooling_rate, term_temp = params
+        replicas = len(seeds)
+        temperatures = [
+            initial_temp * (term_temp / initial_temp) ** (i / max(replicas - 1, 1))
+            for i in range(replicas)
+        ]
+        # Same number of steps per replica as one chain of the cooling schedule
+        total_steps = math.log(term_temp / initial_temp) / math.log(1 - cooling_rate)
+        rounds = max(1, math.ceil(total_steps / exchange_steps))
+        chains = [
+            MappingChain(
+                seed=seed, overlaps=2**31 - 1, stats=AnnealStats(), temperature=t
+            )
+            for seed, t in zip(seeds, temperatures, strict=True)
+        ]
+        states: list[dict | None] = [None] * replicas
+        energies = [0] * replicas
+        best_map: dict[int, int] = {}
+        best_cost = 2**31 - 1
+        rng = random.Random(seeds[0])
+        geometry = geometry_for_arch(arch)
+        start = time.perf_counter()
+        # Why the run ended between rounds, if it did
+        stop_reason = ""
+        for exchange_round in range(rounds):
+            remaining = self.map_timeout_sec - (time.perf_counter() - start)
+            if best_cost == 0:
+                stop_reason = "zero_overlaps"
+                break
+            # The first round always runs so that every chain has a mapping
+            if exchange_round > 0 and remaining <= 0:
+                stop_reason = "timeout"
+                break
+            futures = [
+                pool.submit(
+                    _map_chain,
+                    qubits,
+                    gates,
+                    arch,
+                    [temperatures[i], 0, 0],
+                    remaining,
+                    int(
+                        np.random.SeedSequence(
+                            [seeds[i], exchange_round]
+                        ).generate_state(1)[0]
+                    ),
+                    states[i],
+                    exchange_steps,
+                    phased_graph,
+                )
+                for i in range(replicas)
+            ]
+            for i, future in enumerate(futures):
+                map_dict, cost, stats = future.result()
+                assert stats.final_mapping is not None
+                states[i] = {
+                    q: geometry.cell(x, y) for q, (x, y) in stats.final_mapping.items()
+                }
+                energies[i] = stats.final_overlaps
+                chain = chains[i]
+                if exchange_round == 0:
+                    chain.stats.initial_overlaps = stats.initial_overlaps
+                chain.stats.steps += stats.steps
+                chain.stats.accepted += stats.accepted
+                chain.stats.elapsed_sec += stats.elapsed_sec
+                chain.stats.final_overlaps = stats.final_overlaps
+                chain.stats.final_temperature = temperatures[i]
+                chain.overlaps = min(chain.overlaps, cost)
+                chain.stats.best_overlaps = chain.overlaps
+                chain.stats.stop_reason = stats.stop_reason
+                if cost < best_cost:
+                    best_map, best_cost = map_dict, cost
+            _exchange_replicas(states, energies, temperatures, exchange_round % 2, rng)
+        if stop_reason:
+            for chain in chains:
+                chain.stats.stop_reason = stop_reason
+        return best_map, chains
+
+    def rank_mappings(
+        self, mappings: list[Mapping], profile: CircuitProfile | None = None
+    ) -> list[ScoredMapping]:
+        """
+        Scores mappings of the same circuit by the overlap count `map`
+        anneals on, all in one vectorised call, and sorts them from fewest
+        to most overlaps. It costs far less than routing, so candidates can
+        be screened before `bootstrapped_map` or `route`.
+
+        Args:
+            mappings (list[Mapping]): mappings sharing their gates and architecture
+            profile (CircuitProfile | None): the circuit's profile, see `profile`
+
+        Returns:
+            list[ScoredMapping]: every mapping with its overlap count, best first
+        """
+        if len(mappings) == 0:
+            return []
+        gates, arch = mappings[0].gates, mappings[0].arch
+        assert all(m.gates == gates and m.arch == arch for m in mappings[1:])
+        assert profile is None or profile.num_gates == len(gates)
+        if profile is None:
+            num_qubits = max(q for gate in gates for q in gate) + 1
+            phased_graph = build_compact_phased_graph(gates, num_qubits, include_t=True)
+        else:
+            phased_graph = profile.phased_graph
+        cells = np.zeros((len(mappings), phased_graph.num_qubits), dtype=np.int64)
+        for row, mapping in zip(cells, mappings, strict=True):
+            for q, cell in mapping.map.items():
+                row[int(q)] = cell
+        overlaps = count_overlaps_batch(cells, phased_graph, arch.__dict__)
+        return [
+            ScoredMapping(mapping=mappings[i], overlaps=int(overlaps[i]), index=i)
+            for i in np.argsort(overlaps, kind="stable").tolist()
+        ]
+
+    def route(
+        self,
+        mapping: Mapping,
+        greedy: bool = False,
+        profile: CircuitProfile | None = None,
+    ) -> Routing:
+        """
+        Routes `mapping` within the routing timeout. When the timeout runs
+        out the routing holds the steps found so far and `timed_out` is set.
+        `greedy` routes each timestep in one criticality order instead of
+        searching orders, which is much faster and good enough to screen
+        candidate mappings (see `sim_anneal_route`).
+        `profile` is the circuit's profile, see `profile`.
+        """
+        assert profile is None or profile.num_gates == len(mapping.gates)
+        map_dict = {int(k): v for k, v in mapping.map.items()}
+        steps, timed_out = _route_steps(
+            mapping.gates,
+            mapping.arch.__dict__,
+            map_dict,
+            self.route_timeout_sec,
+            self.order_workers,
+            greedy,
+            None if profile is None else profile.crit_dict,
+        )
+        if timed_out:
             print("Routing Timed out")
-        finally:
-            signal.alarm(0)
+        return self._routing(mapping, steps, timed_out)
 
-        if steps is None:
-            return None
+    def route_many(
+        self,
+        mapping: Mapping,
+        n: int,
+        workers: int | None = None,
+        seeds: list[int] | None = None,
+        greedy: bool = False,
+        profile: CircuitProfile | None = None,
+    ) -> list[RoutingRun]:
+        """
+        Routes `mapping` `n` times in a process pool. The mapping is sent to
+        each worker once and every run is seeded, so the routings only
+        depend on the seeds.
+
+        Args:
+            mapping (Mapping): the mapping to be routed
+            n (int): number of routings
+            workers (int | None): size of the process pool, defaults to the cpu count
+            seeds (list[int] | None): one seed per routing, defaults to 0..n-1
+            greedy (bool): route greedily, as in `route`
+            profile (CircuitProfile | None): the circuit's profile, see `profile`
+
+        Returns:
+            list[RoutingRun]: the routing and routing time of every seed, in order
+        """
+        seeds = list(range(n)) if seeds is None else seeds
+        assert len(seeds) == n
+        assert profile is None or profile.num_gates == len(mapping.gates)
+        map_dict = {int(k): v for k, v in mapping.map.items()}
+        problem = (
+            mapping.gates,
+            mapping.arch.__dict__,
+            map_dict,
+            self.route_timeout_sec,
+            greedy,
+            None if profile is None else profile.crit_dict,
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_route_worker, initargs=problem
+        ) as pool:
+            results = list(pool.map(_route_run, seeds))
+        return [
+            RoutingRun(
+                seed=seed,
+                routing=self._routing(mapping, steps, timed_out),
+                elapsed_sec=elapsed_sec,
+            )
+            for seed, (steps, timed_out, elapsed_sec) in zip(
+                seeds, results, strict=True
+            )
+        ]
 
+    def _routing(self, mapping: Mapping, steps: list, timed_out: bool) -> Routing:
+        # Parse routes
+        routes = [parse_route_unsafe(step) for step in steps]
         return Routing(
             map=mapping.map,
             arch=mapping.arch,
             gates=mapping.gates,
             steps=routes,  # type: ignore
+            timed_out=timed_out,
         )
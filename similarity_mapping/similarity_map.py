@@ -1,32 +1,168 @@
 from .types import Mapping, Circuit, Architecture
+from .dascot.architecture import ArchitectureGeometry, geometry_for_arch
 import random
 
 
+class _FenwickSet:
+    """
+    Set of integers in range(size) kept as a Fenwick tree of membership
+    counts, with O(log size) removal, rank and k-th member queries.
+    """
+
+    def __init__(self, members, size: int) -> None:
+        tree = [0] * (size + 1)
+        count = 0
+        for member in members:
+            tree[member + 1] += 1
+            count += 1
+        # Linear build: every node passes its count on to its parent
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.count = count
+        self._top = 1 << size.bit_length() if size else 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def remove(self, member: int) -> None:
+        i = member + 1
+        while i < len(self.tree):
+            self.tree[i] -= 1
+            i += i & -i
+        self.count -= 1
+
+    def count_below(self, value: int) -> int:
+        """
+        Number of members smaller than `value`.
+        """
+        i = min(max(value, 0), len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def kth(self, k: int) -> int:
+        """
+        The member with `k` smaller members.
+        """
+        position = 0
+        step = self._top
+        while step:
+            if position + step < len(self.tree) and self.tree[position + step] <= k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+        return position
+
+
+class FreeLocations:
+    """
+    Unassigned qubit locations of an architecture, indexed for
+    nearest-location queries.
+
+    Every grid row keeps its free columns in a Fenwick tree, so the free
+    locations on either side of a column are found, and a location is
+    removed, in O(log width). A query scans rows outward from the query
+    point and stops once a row is farther away than the best location
+    found, so it costs O(log width) per row it scans. Ties go to the
+    location listed first in `locations`.
+    """
+
+    def __init__(self, geometry: ArchitectureGeometry, locations: list[int]) -> None:
+        self.geometry = geometry
+        self.locations = list(locations)
+        self._rank = {location: i for i, location in enumerate(self.locations)}
+        columns: list[list[int]] = [[] for _ in range(geometry.height)]
+        for location in self.locations:
+            x, y = geometry.coords(location)
+            columns[y].append(x)
+        self._rows = [_FenwickSet(row, geometry.width) for row in columns]
+        # Ranks of the free locations
+        self._free = _FenwickSet(range(len(self.locations)), len(self.locations))
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def remove(self, location: int) -> None:
+        x, y = self.geometry.coords(location)
+        self._rows[y].remove(x)
+        self._free.remove(self._rank[location])
+
+    def pop_nearest(self, x: int, y: int) -> int:
+        """
+        Removes and returns the free location closest to (x, y) by
+        Euclidean distance.
+        """
+        assert len(self._free) > 0
+        best: tuple[int, int] | None = None
+        height = len(self._rows)
+        dy = 0
+        while best is None or dy * dy <= best[0]:
+            if y - dy < 0 and y + dy >= height:
+                break
+            for row_y in {y - dy, y + dy}:
+                if 0 <= row_y < height and len(self._rows[row_y]) > 0:
+                    best = self._nearest_in_row(row_y, x, dy, best)
+            dy += 1
+        assert best is not None
+        location = self.locations[best[1]]
+        self.remove(location)
+        return location
+
+    def _nearest_in_row(
+        self, row_y: int, x: int, dy: int, best: tuple[int, int] | None
+    ) -> tuple[int, int]:
+        # Only the free locations on either side of x can be closest
+        row = self._rows[row_y]
+        below = row.count_below(x)
+        neighbours = [row.kth(k) for k in (below - 1, below) if 0 <= k < len(row)]
+        for row_x in neighbours:
+            rank = self._rank[self.geometry.cell(row_x, row_y)]
+            candidate = ((row_x - x) ** 2 + dy * dy, rank)
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def pop_random(self) -> int:
+        """
+        Removes and returns a uniformly random free location.
+        """
+        rank = self._free.kth(random.randrange(len(self._free)))
+        location = self.locations[rank]
+        self.remove(location)
+        return location
+
+
 class SimilarityMapper:
     def __init__(self, circuit: Circuit, similar_mapping: Mapping) -> None:
         self.circuit = circuit
         self.similar_mapping = similar_mapping
+        self.circuit_geometry = geometry_for_arch(circuit.arch)
+        self.similar_geometry = geometry_for_arch(similar_mapping.arch)
+
+    def free_locations(self) -> FreeLocations:
+        """
+        Index of the circuit architecture's qubit locations, all free.
+        """
+        return FreeLocations(self.circuit_geometry, self.circuit.arch.alg_qubits)
 
     def find_closest_qubit_location(
         self,
         similar_location: int,
-        circuit_locations: list[int],
-    ) -> tuple[int, list[int]]:
+        circuit_locations: FreeLocations,
+    ) -> int:
         """
-        Finds the closest physical qubit to the assignment location from the search locations.
-        Chooses the location based on cardinal distance.
+        Takes the free physical qubit closest to the assignment location out of
+        the search locations and returns it.
+        Chooses the location based on Euclidean distance.
         """
-        assignment_x = similar_location % self.similar_mapping.arch.width
-        assignment_y = similar_location // self.similar_mapping.arch.height
-
-        def distance(qubit_location) -> float:
-            return (
-                abs(assignment_x - qubit_location % self.circuit.arch.width) ** 2
-                + abs(assignment_y - qubit_location // self.circuit.arch.height) ** 2
-            )
-
-        sorted_locations = sorted(circuit_locations, key=lambda x: distance(x))
-        return sorted_locations[0], sorted_locations[1:]
+        return circuit_locations.pop_nearest(
+            *self.similar_geometry.coords(similar_location)
+        )
 
     def hard_map(self) -> Mapping | None:
         """
@@ -47,10 +183,10 @@ class SimilarityMapper:
         if circuit_qubits != mapping_qubits:
             return None
         # Construct map
-        locations_remaining = self.circuit.arch.alg_qubits.copy()
+        locations_remaining = self.free_locations()
         new_map: dict[str, int] = {}
         for qubit in circuit_qubits:
-            new_map[qubit], locations_remaining = self.find_closest_qubit_location(
+            new_map[qubit] = self.find_closest_qubit_location(
                 self.similar_mapping.map[qubit],
                 locations_remaining,
             )
@@ -81,11 +217,11 @@ class SimilarityMapper:
         new_map: dict[str, int] = {}
         # Partially apply mapping
         # Gives priority to similar qubits
-        locations_remaining = self.circuit.arch.alg_qubits.copy()
+        locations_remaining = self.free_locations()
         unmapped_mapping_qubits: set[str] = set()
         for qubit in mapping_qubits:
             if qubit in circuit_qubits:
-                new_map[qubit], locations_remaining = self.find_closest_qubit_location(
+                new_map[qubit] = self.find_closest_qubit_location(
                     self.similar_mapping.map[qubit], locations_remaining
                 )
             else:
@@ -98,14 +234,14 @@ class SimilarityMapper:
         if len_difference == 0:
             # Circuit and mapping have the same number of qubits
             for qubit in unmapped_circuit_qubits:
-                new_map[qubit], locations_remaining = self.find_closest_qubit_location(
+                new_map[qubit] = self.find_closest_qubit_location(
                     self.similar_mapping.map[unmapped_mapping_qubits.pop()],
                     locations_remaining,
                 )
         elif len_difference > 0:
             # Circuit has more qubits than the mapping
             while len(unmapped_mapping_qubits) > 0:
-                new_map[unmapped_circuit_qubits.pop()], locations_remaining = (
+                new_map[unmapped_circuit_qubits.pop()] = (
                     self.find_closest_qubit_location(
                         self.similar_mapping.map[unmapped_mapping_qubits.pop()],
                         locations_remaining,
@@ -113,14 +249,11 @@ class SimilarityMapper:
                 )
             # Randomly assign remaining locations
             for qubit in unmapped_circuit_qubits:
-                random_location = locations_remaining.pop(
-                    random.randrange(len(locations_remaining))
-                )
-                new_map[qubit] = random_location
+                new_map[qubit] = locations_remaining.pop_random()
         else:
             # Circuit has fewer qubits than the mapping
             while len(unmapped_circuit_qubits) > 0:
-                new_map[unmapped_circuit_qubits.pop()], locations_remaining = (
+                new_map[unmapped_circuit_qubits.pop()] = (
                     self.find_closest_qubit_location(
                         self.similar_mapping.map[unmapped_mapping_qubits.pop()],
                         locations_remaining,
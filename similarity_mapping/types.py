@@ -1,7 +1,15 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
-from typing import Any
-from qiskit import QuantumCircuit
 from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+    from qiskit import QuantumCircuit
+
+    from similarity_mapping.dascot.layering import CompactPhasedGraph
+    from similarity_mapping.dascot.phased_graph import AnnealStats
 
 
 class Architectures(Enum):
@@ -52,6 +60,28 @@ class Mapping:
         return {"map": self.map, "arch": self.arch.to_dict(), "gates": self.gates}
 
 
+@dataclass
+class MappingChain:
+    seed: int
+    overlaps: int
+    stats: AnnealStats
+    temperature: float | None = None
+
+
+@dataclass
+class ParallelMapping:
+    mapping: Mapping
+    chains: list[MappingChain]
+
+
+@dataclass
+class ScoredMapping:
+    mapping: Mapping
+    overlaps: int
+    # Position of the mapping in the batch that was scored
+    index: int
+
+
 @dataclass
 class Circuit:
     arch: Architecture
@@ -61,6 +91,27 @@ class Circuit:
         return {"arch": self.arch.to_dict(), "gates": self.gates}
 
 
+@dataclass(frozen=True)
+class CircuitProfile:
+    """
+    Preprocessing of a circuit that mapping and routing share. Build it
+    once with `Dascot.profile` and pass it to every call on that circuit.
+    It holds only sets, dicts, lists and NumPy arrays, so it pickles
+    cheaply to worker processes.
+    """
+
+    num_gates: int
+    qubits: set[int]
+    # ASAP layer of every gate
+    layers: np.ndarray
+    depth: int
+    phased_graph: CompactPhasedGraph
+    # Criticality of every gate id, the routing reward table
+    crit_dict: dict[int, int]
+    # Initial temperature, cooling rate and termination temperature
+    anneal_params: list[float]
+
+
 @dataclass
 class Route:
     id: int
@@ -75,9 +126,20 @@ class Routing:
     steps: list[Route]
     arch: Architecture
     gates: list[list[int]]
+    # Set when the deadline expired before every gate was routed
+    timed_out: bool = False
+
+
+@dataclass
+class RoutingRun:
+    seed: int
+    routing: Routing
+    elapsed_sec: float
 
 
 def qasm_from_gates(gates: list[list[int]], num_qubits: int) -> QuantumCircuit:
+    from qiskit import QuantumCircuit
+
     qcircuit = QuantumCircuit(num_qubits)
     for gate in gates:
         if len(gate) == 1:
@@ -0,0 +1,96 @@
+import rustworkx as rx
+
+from similarity_mapping.dascot.architecture import (
+    compact_layout,
+    geometry_for_arch,
+    horizontal_neighbors,
+    insert_column_left,
+    insert_column_right,
+    square_sparse_layout,
+    vertical_neighbors,
+)
+from similarity_mapping.types import parse_architecture_safe
+
+
+def test_geometry_tables() -> None:
+    """
+    The geometry tables agree with the neighbour helpers and the layout,
+    and geometries are shared between equal architectures.
+    """
+    for layout in (compact_layout, square_sparse_layout):
+        arch = layout(7, magic_states="all_sides")
+        geometry = geometry_for_arch(arch)
+        width, height = arch["width"], arch["height"]
+        for n in range(width * height):
+            assert geometry.coords(n) == (n % width, n // width)
+            assert geometry.cell(*geometry.coords(n)) == n
+            assert geometry.vertical_neighbors(n) == vertical_neighbors(
+                n, width, height, omitted_edges=[]
+            )
+            assert geometry.horizontal_neighbors(n) == horizontal_neighbors(
+                n, width, height, omitted_edges=[]
+            )
+        assert geometry_for_arch(parse_architecture_safe(arch)) is geometry
+
+
+def test_insert_column_magic_states() -> None:
+    """
+    Inserting a column moves the magic states with their cells.
+    """
+    arch = {"height": 2, "width": 3, "alg_qubits": [0, 5], "magic_states": [1, 4]}
+    left = insert_column_left(arch)
+    assert left["alg_qubits"] == [1, 7]
+    assert left["magic_states"] == [2, 6]
+    right = insert_column_right(arch)
+    assert right["alg_qubits"] == [0, 6]
+    assert right["magic_states"] == [1, 5]
+
+
+def test_magic_state_tables() -> None:
+    """
+    The per-cell magic state tables match sorting the magic states by
+    Manhattan distance, ties keeping the architecture's order.
+    """
+    for layout in (compact_layout, square_sparse_layout):
+        arch = layout(10, magic_states="all_sides")
+        geometry = geometry_for_arch(arch)
+        for n in range(geometry.num_cells):
+            by_distance = sorted(
+                arch["magic_states"], key=lambda m: geometry.distance(m, n)
+            )
+            assert geometry.magic_states_by_distance[n].tolist() == by_distance
+            assert geometry.nearest_magic_state[n] == by_distance[0]
+            assert geometry.nearest_magic_state_xy[n].tolist() == list(
+                geometry.coords(by_distance[0])
+            )
+            assert geometry.nearest_magic_state_distance[n] == geometry.distance(
+                by_distance[0], n
+            )
+
+
+def test_port_distances() -> None:
+    """
+    CNOT and T gate port distances equal the shortest path lengths on the
+    empty rustworkx grid graph the router uses.
+    """
+    for layout in (compact_layout, square_sparse_layout):
+        arch = layout(6, magic_states="all_sides")
+        geometry = geometry_for_arch(arch)
+        lengths = rx.distance_matrix(
+            rx.generators.grid_graph(geometry.height, geometry.width)
+        )
+        for control in arch["alg_qubits"]:
+            expected_t = min(
+                int(lengths[vn, hn])
+                for m in arch["magic_states"]
+                for vn in geometry.vertical_neighbors(control)
+                for hn in geometry.horizontal_neighbors(m)
+            )
+            assert geometry.t_port_distance[control] == expected_t
+            for target in arch["alg_qubits"]:
+                expected = min(
+                    int(lengths[vn, hn])
+                    for vn in geometry.vertical_neighbors(control)
+                    for hn in geometry.horizontal_neighbors(target)
+                )
+                assert geometry.cnot_port_distance(control, target) == expected
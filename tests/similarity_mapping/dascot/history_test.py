@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+from similarity_mapping.dascot.history import MappingHistory
+from similarity_mapping.dascot.layering import build_compact_phased_graph
+from similarity_mapping.dascot.phased_graph import (
+    AnnealStats,
+    build_phased_map,
+    count_overlapping_fast,
+)
+from tests.similarity_mapping.helpers import TEST_ARCH, TEST_GATES, TEST_QUBITS
+
+
+def test_history_rows(tmp_path) -> None:
+    """
+    Every recorded step is a valid mapping whose cost is its overlap count,
+    and the .npy sink holds exactly the recorded steps.
+    """
+    random.seed(0)
+    np.random.seed(0)
+    stats = AnnealStats()
+    path = tmp_path / "history.npy"
+    history = build_phased_map(
+        TEST_QUBITS,
+        TEST_GATES,
+        TEST_ARCH,
+        100,
+        0.1,
+        0.1,
+        10,
+        retain_history=True,
+        history_path=path,
+        stats=stats,
+    )
+    assert isinstance(history, MappingHistory)
+    assert len(history) == stats.steps > 0
+
+    grid_len = TEST_ARCH["width"]
+    graph = build_compact_phased_graph(TEST_GATES, len(TEST_QUBITS))
+    for mapping, cost in history.rows():
+        assert sorted(q for q, _ in mapping) == sorted(TEST_QUBITS)
+        assert len({p for _, p in mapping}) == len(TEST_QUBITS)
+        mapping_2d = {q: (p % grid_len, p // grid_len) for q, p in mapping}
+        assert cost == count_overlapping_fast(mapping_2d, graph, TEST_ARCH)
+
+    records = np.load(path)
+    assert len(records) == len(history)
+    assert np.array_equal(records["positions"], history.positions)
+    assert np.array_equal(records["cost"], history.costs)
+
+
+def test_history_grows(tmp_path) -> None:
+    """
+    Histories grow past their initial capacity, in memory and on disk.
+    """
+    rows = np.array([[0, 1], [1, 0], [0, 1]])
+    costs = np.array([3, 2, 1])
+    expected = [([(0, 0), (1, 1)], 3), ([(0, 1), (1, 0)], 2), ([(0, 0), (1, 1)], 1)]
+    for path in (None, tmp_path / "history.npy"):
+        history = MappingHistory([0, 1], 1, path)
+        for k in range(3):
+            history.extend(rows[k : k + 1], costs[k : k + 1])
+        history.close()
+        assert list(history) == expected
+    assert np.array_equal(np.load(tmp_path / "history.npy")["cost"], costs)
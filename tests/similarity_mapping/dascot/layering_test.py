@@ -0,0 +1,73 @@
+from similarity_mapping.dascot.architecture import compact_layout
+from similarity_mapping.dascot.layering import (
+    as_compact_phased_graph,
+    build_compact_phased_graph,
+    build_phased_connectivity_graph_from_gates,
+    circuit_depth,
+    gate_layers,
+)
+from similarity_mapping.dascot.phased_graph import (
+    build_phased_connectivity_graph_fast,
+    build_phased_map,
+)
+from similarity_mapping.types import qasm_from_gates
+
+TEST_GATES = [[0, 1], [2], [1, 2], [0], [3], [3, 0], [2], [1, 3], [0, 2]]
+
+
+def test_gate_layers() -> None:
+    """
+    Gates land one layer after the latest gate on any of their qubits.
+    """
+    assert gate_layers(TEST_GATES) == [0, 0, 1, 1, 0, 2, 2, 3, 3]
+    assert circuit_depth(TEST_GATES) == 4
+    assert circuit_depth([]) == 0
+
+
+def test_matches_qiskit_layers() -> None:
+    """
+    The native layering reproduces the qiskit DAG based phased graphs and depth.
+    """
+    qcircuit = qasm_from_gates(TEST_GATES, 4)
+    assert build_phased_connectivity_graph_from_gates(
+        TEST_GATES, 4
+    ) == build_phased_connectivity_graph_fast(qcircuit)
+    assert build_phased_connectivity_graph_from_gates(
+        TEST_GATES, 4, include_t=False
+    ) == build_phased_connectivity_graph_fast(qcircuit, include_t=False)
+    assert circuit_depth(TEST_GATES) == qcircuit.depth(
+        filter_function=lambda x: x.operation.name in ["cx", "t", "tdg"]
+    )
+
+
+def test_compact_phased_graph() -> None:
+    """
+    The compact graph holds the same edges per layer as the dict of edge sets.
+    """
+    phased_graphs = build_phased_connectivity_graph_from_gates(TEST_GATES, 4)
+    for compact in [
+        build_compact_phased_graph(TEST_GATES, 4),
+        as_compact_phased_graph(phased_graphs),
+    ]:
+        assert compact.num_layers == len(phased_graphs)
+        assert len(compact.controls) == len(TEST_GATES)
+        for layer, g in phased_graphs.items():
+            assert set(compact.layer_edges(layer)) == {
+                x for edges in g.values() for x in edges
+            }
+    without_t = build_compact_phased_graph(TEST_GATES, 4, include_t=False)
+    assert without_t.num_layers == len(phased_graphs)
+    assert len(without_t.controls) == 5
+
+
+def test_build_phased_map_empty_circuit() -> None:
+    """
+    A circuit without gates maps with no overlaps, whether or not it has
+    qubits to place.
+    """
+    arch = compact_layout(2, magic_states="all_sides")
+    assert build_phased_map(set(), [], arch, 100, 0.1, 0.1, 10) == ([], 0)
+    phased_map, cost = build_phased_map({0, 1}, [], arch, 100, 0.1, 0.1, 10)
+    assert cost == 0
+    assert sorted(q for q, _ in phased_map) == [0, 1]
+    assert {p for _, p in phased_map} <= set(arch["alg_qubits"])
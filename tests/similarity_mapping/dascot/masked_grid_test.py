@@ -0,0 +1,103 @@
+import random
+
+import rustworkx as rx
+
+from similarity_mapping.dascot.architecture import (
+    compact_layout,
+    geometry_for_arch,
+    square_sparse_layout,
+)
+from similarity_mapping.dascot.masked_grid import MaskedGrid
+from similarity_mapping.dascot.sarouting import (
+    initialize_to_remove,
+    route_gate,
+    route_gate_fast,
+)
+
+
+def test_paths_match_rustworkx() -> None:
+    """
+    Distances and paths on the masked grid are the ones rustworkx's
+    Dijkstra gives on a grid graph with the blocked nodes removed.
+    """
+    rng = random.Random(0)
+    for layout in (compact_layout, square_sparse_layout):
+        geometry = geometry_for_arch(layout(12, magic_states="all_sides"))
+        grid = MaskedGrid(geometry)
+        for _ in range(40):
+            blocked = {
+                c for c in range(geometry.num_cells) if rng.random() < rng.random() / 2
+            }
+            graph = rx.generators.grid_graph(rows=geometry.height, cols=geometry.width)
+            graph.remove_nodes_from(list(blocked))
+            grid.reset(blocked)
+            free = [c for c in range(geometry.num_cells) if c not in blocked]
+            for _ in range(5):
+                s, t = rng.sample(free, 2)
+                lengths = rx.dijkstra_shortest_path_lengths(
+                    graph, edge_cost_fn=lambda _: 1, node=s, goal=t
+                )
+                assert grid.distances(s, [t]) == {k: int(v) for k, v in lengths.items()}
+                if t in lengths:
+                    expected = list(rx.dijkstra_shortest_paths(graph, s, t)[t])
+                    assert grid.path(s, t) == expected
+                else:
+                    assert grid.path(s, t) is None
+
+
+def test_route_gate_fast() -> None:
+    """
+    Routing a sequence of gates on the masked grid gives the same routes
+    as route_gate with its set of removed nodes.
+    """
+    rng = random.Random(1)
+    arch = compact_layout(10, magic_states="all_sides")
+    geometry = geometry_for_arch(arch)
+    grid = MaskedGrid(geometry)
+    for take_first_ms in (True, False):
+        for _ in range(20):
+            mapping = dict(enumerate(rng.sample(arch["alg_qubits"], 10)))
+            gates = [rng.sample(range(10), rng.choice((1, 2))) for _ in range(6)]
+            to_remove = initialize_to_remove(geometry.magic_states, mapping)
+            grid.reset(to_remove)
+            for indexed_gate in enumerate(gates):
+                expected, to_remove = route_gate(
+                    indexed_gate, geometry, mapping, to_remove, take_first_ms
+                )
+                assert route_gate_fast(indexed_gate, grid, mapping, take_first_ms) == [
+                    (i, gate, list(path)) for i, gate, path in expected
+                ]
+
+
+def test_search_labels_lowest_ranked_source() -> None:
+    """
+    The multi-source search reports each target with its distance and the
+    lowest-ranked source at that distance, stopping at the nearest level.
+    An exhaustive search reports every reachable target with the lowest
+    rank of any source connected to it.
+    """
+    rng = random.Random(2)
+    geometry = geometry_for_arch(compact_layout(12, magic_states="all_sides"))
+    grid = MaskedGrid(geometry)
+    for _ in range(40):
+        blocked = {c for c in range(geometry.num_cells) if rng.random() < 0.3}
+        grid.reset(blocked)
+        free = [c for c in range(geometry.num_cells) if c not in blocked]
+        sources = rng.sample(free, 3)
+        targets = set(rng.sample(free, 4))
+        distances = [grid.distances(s, targets) for s in sources]
+        reachable = {
+            t: [rank for rank, d in enumerate(distances) if t in d] for t in targets
+        }
+        nearest = min((d for ds in distances for d in ds.values()), default=None)
+        expected = {
+            t: (nearest, ranks[0])
+            for t, ranks in reachable.items()
+            for ranks in [[r for r in ranks if distances[r][t] == nearest]]
+            if ranks
+        }
+        assert grid.search(sources, targets) == expected
+        found = grid.search(sources, targets, exhaustive=True)
+        assert {t: rank for t, (_, rank) in found.items()} == {
+            t: ranks[0] for t, ranks in reachable.items() if ranks
+        }
@@ -0,0 +1,168 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from similarity_mapping.dascot import overlaps
+from similarity_mapping.dascot.architecture import geometry_for_arch
+from similarity_mapping.dascot.layering import build_compact_phased_graph
+from similarity_mapping.dascot.overlaps import (
+    OverlapEngine,
+    count_overlapping_boxes,
+    count_overlaps_batch,
+)
+from similarity_mapping.dascot.phased_graph import (
+    build_phased_connectivity_graph_fast,
+    count_overlapping_fast,
+    overlapping,
+    update_overlaps_fast,
+)
+from similarity_mapping.types import qasm_from_gates
+from tests.similarity_mapping.helpers import (
+    TEST_ARCH,
+    TEST_GATES,
+    TEST_QUBITS,
+    random_mapping,
+)
+
+TEST_PHASED_GRAPHS = build_phased_connectivity_graph_fast(
+    qasm_from_gates(TEST_GATES, len(TEST_QUBITS))
+)
+
+
+def test_engine_initial_count() -> None:
+    """
+    The engine starts from the same overlap count as the reference counter.
+    """
+    for seed in range(10):
+        mapping = random_mapping(seed)
+        engine = OverlapEngine(mapping, TEST_PHASED_GRAPHS, TEST_ARCH)
+        assert engine.overlaps == count_overlapping_fast(
+            mapping, TEST_PHASED_GRAPHS, TEST_ARCH
+        )
+
+
+def test_compact_graph_input() -> None:
+    """
+    The counters and the engine accept the compact graph in place of the dict.
+    """
+    compact = build_compact_phased_graph(TEST_GATES, len(TEST_QUBITS))
+    for seed in range(5):
+        mapping = random_mapping(seed)
+        expected = count_overlapping_fast(mapping, TEST_PHASED_GRAPHS, TEST_ARCH)
+        assert count_overlapping_fast(mapping, compact, TEST_ARCH) == expected
+        assert OverlapEngine(mapping, compact, TEST_ARCH).overlaps == expected
+        new_mapping = mapping.copy()
+        new_mapping[0], new_mapping[1] = mapping[1], mapping[0]
+        assert update_overlaps_fast(
+            compact, TEST_ARCH, mapping, new_mapping, 0, 1
+        ) == update_overlaps_fast(
+            TEST_PHASED_GRAPHS, TEST_ARCH, mapping, new_mapping, 0, 1
+        )
+
+
+def test_engine_swap_deltas() -> None:
+    """
+    A single candidate swap scores the same delta as update_overlaps_fast,
+    and applying it keeps the running count exact.
+    """
+    mapping = random_mapping(0)
+    engine = OverlapEngine(mapping, TEST_PHASED_GRAPHS, TEST_ARCH)
+    qubits = sorted(TEST_QUBITS)
+    for _ in range(100):
+        qubit1, qubit2 = random.sample(qubits, 2)
+        new_mapping = mapping.copy()
+        new_mapping[qubit1], new_mapping[qubit2] = mapping[qubit2], mapping[qubit1]
+        (delta,) = engine.swap_deltas([qubit1], [qubit2])
+        assert delta == update_overlaps_fast(
+            TEST_PHASED_GRAPHS, TEST_ARCH, mapping, new_mapping, qubit1, qubit2
+        )
+        if random.random() < 0.5:
+            engine.apply_swap(qubit1, qubit2, int(delta))
+            mapping = new_mapping
+        assert engine.overlaps == count_overlapping_fast(
+            mapping, TEST_PHASED_GRAPHS, TEST_ARCH
+        )
+
+
+def test_sweep_line_count() -> None:
+    """
+    The sweep-line counter agrees with the pairwise check, including boxes
+    that only share an edge or a corner.
+    """
+    rng = np.random.default_rng(0)
+    for num_boxes in [0, 1, 2, 10, 100]:
+        corners = rng.integers(0, 8, size=(num_boxes, 2, 2))
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        boxes = np.stack((lo[:, 0], hi[:, 0], lo[:, 1], hi[:, 1]), axis=1)
+        expected = sum(
+            overlapping(*box1, *box2)
+            for box1, box2 in itertools.combinations(boxes.tolist(), r=2)
+        )
+        assert count_overlapping_boxes(boxes) == expected
+
+
+def test_engine_batched_swap_deltas() -> None:
+    """
+    A block of candidate swaps scores the same deltas as scoring each one
+    on its own, and applying one keeps the running count exact.
+    """
+    mapping = random_mapping(1)
+    engine = OverlapEngine(mapping, TEST_PHASED_GRAPHS, TEST_ARCH)
+    qubits = sorted(TEST_QUBITS)
+    for _ in range(20):
+        candidates = [random.sample(qubits, 2) for _ in range(8)]
+        deltas = engine.swap_deltas(
+            [qubit1 for qubit1, _ in candidates], [qubit2 for _, qubit2 in candidates]
+        )
+        for (qubit1, qubit2), delta in zip(candidates, deltas, strict=True):
+            assert engine.swap_deltas([qubit1], [qubit2]) == [delta]
+        qubit1, qubit2 = candidates[0]
+        engine.apply_swap(qubit1, qubit2, int(deltas[0]))
+        mapping[qubit1], mapping[qubit2] = mapping[qubit2], mapping[qubit1]
+        assert engine.overlaps == count_overlapping_fast(
+            mapping, TEST_PHASED_GRAPHS, TEST_ARCH
+        )
+
+
+def test_count_overlaps_batch(monkeypatch) -> None:
+    """
+    The batch count of every mapping matches the count an engine starts
+    from, also when the pairs are compared in several blocks.
+    """
+    mappings = [random_mapping(seed) for seed in range(10)]
+    grid_len = TEST_ARCH["width"]
+    cells = np.array(
+        [
+            [mapping[q][0] + mapping[q][1] * grid_len for q in sorted(TEST_QUBITS)]
+            for mapping in mappings
+        ]
+    )
+    expected = [
+        OverlapEngine(mapping, TEST_PHASED_GRAPHS, TEST_ARCH).overlaps
+        for mapping in mappings
+    ]
+    counts = count_overlaps_batch(cells, TEST_PHASED_GRAPHS, TEST_ARCH)
+    assert counts.tolist() == expected
+    monkeypatch.setattr(overlaps, "BATCH_PAIR_BLOCK", 10)
+    counts = count_overlaps_batch(cells, TEST_PHASED_GRAPHS, TEST_ARCH)
+    assert counts.tolist() == expected
+
+
+def test_no_magic_states() -> None:
+    """
+    Without magic states, circuits without T gates still count overlaps and
+    a circuit with T gates raises instead of pointing at an arbitrary cell.
+    """
+    arch = dict(TEST_ARCH, magic_states=[])
+    cnots = [gate for gate in TEST_GATES if len(gate) == 2]
+    compact = build_compact_phased_graph(cnots, len(TEST_QUBITS))
+    mapping = random_mapping(0)
+    expected = count_overlapping_fast(mapping, compact, TEST_ARCH)
+    assert count_overlapping_fast(mapping, compact, arch) == expected
+    assert OverlapEngine(mapping, compact, arch).overlaps == expected
+    cells = [[geometry_for_arch(arch).cell(*mapping[q]) for q in range(7)]]
+    assert count_overlaps_batch(cells, compact, arch).tolist() == [expected]
+    with pytest.raises(ValueError):
+        OverlapEngine(mapping, TEST_PHASED_GRAPHS, arch)
@@ -0,0 +1,141 @@
+import random
+
+import numpy as np
+
+from similarity_mapping.dascot import sarouting
+from similarity_mapping.dascot.architecture import compact_layout, geometry_for_arch
+from similarity_mapping.dascot.deadline import Deadline
+from similarity_mapping.dascot.sarouting import (
+    PrefixRouteCache,
+    build_crit_dict_fast,
+    build_crit_dict_linear,
+    build_reward_table,
+    criticality,
+    criticality_exact,
+    dependent,
+    dependent_fast,
+    sim_anneal_route,
+    try_order,
+)
+from similarity_mapping.dascot.scheduler import FrontLayerScheduler
+from tests.similarity_mapping.helpers import random_gates
+
+
+def test_build_crit_dict_linear() -> None:
+    """
+    The reverse-pass criticality matches build_crit_dict_fast on random
+    circuits, including empty and single-qubit ones.
+    """
+    rng = random.Random(0)
+    assert build_crit_dict_linear({}) == {}
+    for _ in range(200):
+        gates = dict(
+            enumerate(random_gates(rng, rng.randint(1, 8), rng.randint(1, 60)))
+        )
+        assert build_crit_dict_linear(gates) == build_crit_dict_fast(gates)
+
+
+def test_table_rewards_match_reference() -> None:
+    """
+    While a circuit is routed front by front, the dependent and exact
+    criticality rewards read from DependencyDAG tables equal the reference
+    rewards computed from the gates left after each step.
+    """
+    rng = random.Random(1)
+    for _ in range(30):
+        gates = dict(
+            enumerate(random_gates(rng, rng.randint(1, 6), rng.randint(1, 40)))
+        )
+        dependent_counts = build_reward_table("dependent", gates)
+        chain_lengths = build_reward_table("criticality_exact", gates)
+        scheduler = FrontLayerScheduler(gates)
+        while len(scheduler):
+            front = scheduler.executable()
+            step = [(id, gate, []) for id, gate in front.items() if rng.random() < 0.7]
+            routed = {id for id, _, _ in step}
+            remaining = {k: v for k, v in scheduler.unrouted.items() if k not in routed}
+            assert dependent_fast(step, None, dependent_counts) == dependent(
+                step, remaining, None
+            )
+            assert criticality_exact(step, None, chain_lengths) == criticality(
+                step, remaining, None
+            )
+            scheduler.retire(routed)
+
+
+def test_prefix_route_cache_matches_try_order() -> None:
+    """
+    Orders routed through the prefix trie, in any sequence and with the
+    trie full or not, give the same steps as routing them from scratch.
+    """
+    rng = random.Random(2)
+    arch = compact_layout(12, magic_states="all_sides")
+    geometry = geometry_for_arch(arch)
+    for max_nodes in (1, 8, 4096):
+        for _ in range(10):
+            mapping = dict(enumerate(rng.sample(arch["alg_qubits"], 12)))
+            qubits = rng.sample(range(12), 12)
+            executable = {
+                i: qubits[2 * i : 2 * i + 2] if i < 4 else [qubits[i + 4]]
+                for i in range(7)
+            }
+            router = PrefixRouteCache(executable, geometry, mapping, True, max_nodes)
+            for _ in range(30):
+                order = rng.sample(range(7), 7)
+                expected = try_order(order, executable, geometry, mapping, True)
+                assert router.route(order) == expected
+
+
+def test_order_workers_route_the_same(monkeypatch) -> None:
+    """
+    Routing with an order pool gives the same steps as routing in one
+    process, with every exhaustive timestep sent to the pool.
+    """
+    monkeypatch.setattr(sarouting, "MIN_PARALLEL_ORDERS", 2)
+    rng = random.Random(3)
+    gates = random_gates(rng, 10, 60)
+    arch = compact_layout(10, magic_states="all_sides")
+    mapping = dict(enumerate(rng.sample(arch["alg_qubits"], 10)))
+    results = []
+    for order_workers in (1, 2):
+        random.seed(0)
+        np.random.seed(0)
+        results.append(
+            sim_anneal_route(
+                gates, arch, mapping, 10, 0.1, 0.1, 1, order_workers=order_workers
+            )
+        )
+    assert results[0] == results[1]
+
+
+def test_greedy_routes_every_gate() -> None:
+    """
+    Greedy routing routes every gate exactly once, tries one order per
+    timestep and never routes two gates on the same qubit in one timestep.
+    """
+    rng = random.Random(4)
+    gates = random_gates(rng, 10, 80)
+    arch = compact_layout(10, magic_states="all_sides")
+    mapping = dict(enumerate(rng.sample(arch["alg_qubits"], 10)))
+    steps, tried = sim_anneal_route(gates, arch, mapping, 10, 0.1, 0.1, 1, greedy=True)
+    assert tried == len(steps)
+    routed = [gate[0] for step in steps for gate in step]
+    assert sorted(routed) == list(range(len(gates)))
+    for step in steps:
+        qubits = [q for _, gate_qubits, _ in step for q in gate_qubits]
+        assert len(qubits) == len(set(qubits))
+
+
+def test_unroutable_gate_stops_routing() -> None:
+    """
+    A gate that can never be routed ends routing at the first timestep that
+    routes nothing, instead of adding empty timesteps until the deadline.
+    """
+    arch = dict(compact_layout(4, magic_states="all_sides"), magic_states=[])
+    mapping = dict(enumerate(arch["alg_qubits"]))
+    gates = [[0, 1], [2], [1, 3]]
+    for greedy in (False, True):
+        steps, _ = sim_anneal_route(
+            gates, arch, mapping, 10, 0.1, 0.1, 1, greedy=greedy, deadline=Deadline(60)
+        )
+        assert [[gate[0] for gate in step] for step in steps] == [[0], [2]]
@@ -0,0 +1,31 @@
+import random
+
+from similarity_mapping.dascot.sarouting import executable_subset
+from similarity_mapping.dascot.scheduler import FrontLayerScheduler
+
+
+def test_front_matches_executable_subset() -> None:
+    """
+    Retiring random subsets of the front gives the same executable gates,
+    in the same order, as rebuilding the gate table and calling
+    executable_subset after every step, and the unrouted view lists the
+    gates in the order of that table.
+    """
+    rng = random.Random(0)
+    for _ in range(50):
+        num_qubits = rng.randint(1, 6)
+        gates = {
+            i: rng.sample(range(num_qubits), min(num_qubits, rng.choice((1, 2))))
+            for i in range(rng.randint(1, 40))
+        }
+        table = dict(gates)
+        scheduler = FrontLayerScheduler(gates)
+        while table:
+            executable, remaining = executable_subset(table)
+            assert list(scheduler.executable().items()) == list(executable.items())
+            assert list(scheduler.unrouted.items()) == list(table.items())
+            routed = [id for id in executable if rng.random() < 0.5]
+            scheduler.retire(routed)
+            not_executed = {id: executable[id] for id in executable if id not in routed}
+            table = {**not_executed, **remaining}
+        assert len(scheduler) == 0 and not scheduler.front
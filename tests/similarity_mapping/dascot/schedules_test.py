@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+
+from similarity_mapping.dascot.phased_graph import AnnealStats, build_phased_map
+from similarity_mapping.dascot.schedules import GeometricSchedule, ReheatingSchedule
+from tests.similarity_mapping.helpers import TEST_ARCH, TEST_GATES, TEST_QUBITS
+
+
+def test_geometric_schedule() -> None:
+    """
+    The geometric schedule cools by the cooling rate every step, cuts
+    block temperatures at the termination temperature, and stops once the
+    best cost has not improved for a full window.
+    """
+    schedule = GeometricSchedule(1.0, 0.5, 0.1)
+    assert np.allclose(schedule.temperatures(10), [1.0, 0.5, 0.25, 0.125])
+    schedule.update(4, accepted=True, improved=True)
+    assert schedule.finished() and not schedule.stalled()
+
+    schedule = GeometricSchedule(1.0, 0.0, 0.1, stall_window=10)
+    schedule.update(5, accepted=True, improved=True)
+    schedule.update(9, accepted=True, improved=False)
+    assert not schedule.finished()
+    schedule.update(1, accepted=True, improved=False)
+    assert schedule.stalled() and schedule.finished()
+
+    schedule = GeometricSchedule(1.0, 0.0, 0.1, stall_window=10, min_acceptance=0.2)
+    schedule.update(5, accepted=True, improved=False)
+    schedule.update(5, accepted=True, improved=True)
+    assert not schedule.finished()
+    schedule.update(6, accepted=False, improved=True)
+    assert schedule.stalled()
+
+
+def test_reheating_schedule() -> None:
+    """
+    The reheating schedule reheats on a stall until it runs out of reheats.
+    """
+    schedule = ReheatingSchedule(
+        8.0, 0.5, 0.01, stall_window=4, reheat_factor=0.5, max_reheats=2
+    )
+    schedule.update(4, accepted=False, improved=False)
+    assert schedule.reheats == 1 and schedule.temperature == 4.0
+    assert not schedule.finished()
+    schedule.update(4, accepted=False, improved=False)
+    assert schedule.reheats == 2 and schedule.temperature == 2.0
+    schedule.update(4, accepted=False, improved=False)
+    assert schedule.reheats == 2 and schedule.finished()
+
+
+def test_progress_and_warm_start() -> None:
+    """
+    Progress reports a non-increasing sequence of incumbents ending at the
+    returned mapping, and a warm-started run starts colder.
+    """
+    random.seed(0)
+    np.random.seed(0)
+    incumbents = []
+    stats = AnnealStats()
+    tuples, cost = build_phased_map(
+        TEST_QUBITS,
+        TEST_GATES,
+        TEST_ARCH,
+        10,
+        0.01,
+        0.1,
+        10,
+        stats=stats,
+        progress=lambda mapping, overlaps: incumbents.append((mapping, overlaps)),
+    )
+    costs = [overlaps for _, overlaps in incumbents]
+    assert costs == sorted(costs, reverse=True)
+    assert incumbents[-1] == (tuples, cost)
+    assert stats.stop_reason in ("zero_overlaps", "temperature")
+
+    warm_stats = AnnealStats()
+    build_phased_map(
+        TEST_QUBITS,
+        TEST_GATES,
+        TEST_ARCH,
+        10,
+        0.01,
+        0.1,
+        10,
+        initial_mapping=dict(tuples),
+        max_steps=1,
+        stats=warm_stats,
+    )
+    assert warm_stats.final_temperature < 10 * 0.1
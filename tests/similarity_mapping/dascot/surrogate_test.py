@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+
+from similarity_mapping.dascot.layering import build_compact_phased_graph
+from similarity_mapping.dascot.phased_graph import (
+    AnnealStats,
+    build_phased_map,
+)
+from similarity_mapping.dascot.surrogate import SurrogateEngine
+from tests.similarity_mapping.helpers import (
+    TEST_ARCH,
+    TEST_GATES,
+    TEST_QUBITS,
+    random_mapping,
+)
+
+TEST_GRAPH = build_compact_phased_graph(TEST_GATES, len(TEST_QUBITS))
+
+
+def surrogate_cost(mapping: dict) -> int:
+    grid_len = TEST_ARCH["width"]
+    magic_states = [(m % grid_len, m // grid_len) for m in TEST_ARCH["magic_states"]]
+    cost = 0
+    for gate in TEST_GATES:
+        x1, y1 = mapping[gate[0]]
+        if len(gate) == 2:
+            x2, y2 = mapping[gate[1]]
+            cost += abs(x1 - x2) + abs(y1 - y2)
+        else:
+            cost += min(abs(x1 - x) + abs(y1 - y) for (x, y) in magic_states)
+    return cost
+
+
+def test_surrogate_swap_deltas() -> None:
+    """
+    Batched surrogate deltas match recomputing the cost from scratch,
+    and applying a swap keeps the running cost exact.
+    """
+    for seed in range(5):
+        mapping = random_mapping(seed)
+        engine = SurrogateEngine(mapping, TEST_GRAPH, TEST_ARCH)
+        assert engine.cost == surrogate_cost(mapping)
+        rng = np.random.default_rng(seed)
+        for _ in range(20):
+            pairs = np.array([rng.choice(7, size=2, replace=False) for _ in range(8)])
+            deltas = engine.swap_deltas(pairs[:, 0], pairs[:, 1])
+            for (q1, q2), delta in zip(pairs.tolist(), deltas.tolist(), strict=True):
+                swapped = mapping.copy()
+                swapped[q1], swapped[q2] = swapped[q2], swapped[q1]
+                assert delta == surrogate_cost(swapped) - surrogate_cost(mapping)
+            q1, q2 = pairs[0].tolist()
+            engine.apply_swap(q1, q2, int(deltas[0]))
+            mapping[q1], mapping[q2] = mapping[q2], mapping[q1]
+            assert engine.cost == surrogate_cost(mapping)
+
+
+def test_two_phase_map() -> None:
+    """
+    A two-phase run fills the statistics of both phases and returns a
+    valid mapping.
+    """
+    random.seed(0)
+    np.random.seed(0)
+    surrogate_stats, stats = AnnealStats(), AnnealStats()
+    tuples, _ = build_phased_map(
+        TEST_QUBITS,
+        TEST_GATES,
+        TEST_ARCH,
+        100,
+        0.01,
+        0.1,
+        10,
+        surrogate_timeout=10,
+        surrogate_stats=surrogate_stats,
+        stats=stats,
+    )
+    assert surrogate_stats.steps > 0 and stats.steps > 0
+    assert surrogate_stats.best_overlaps <= surrogate_stats.initial_overlaps
+    assert sorted(q for q, _ in tuples) == sorted(TEST_QUBITS)
+    assert len({p for _, p in tuples}) == len(TEST_QUBITS)
+    assert {p for _, p in tuples} <= set(TEST_ARCH["alg_qubits"])
@@ -0,0 +1,249 @@
+import itertools
+import pickle
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from similarity_mapping.dascot.architecture import compact_layout
+from similarity_mapping.dascot.dascot import extract_qubits_from_gates
+from similarity_mapping.dascot.schedules import ReheatingSchedule
+from similarity_mapping.dascot_connection import (
+    Dascot,
+    _exchange_replicas,
+    _map_chain,
+)
+from similarity_mapping.types import (
+    Circuit,
+    Mapping,
+    MappingChain,
+    parse_architecture_safe,
+)
+from tests.similarity_mapping.helpers import random_circuit_mapping
+
+TEST_ARCH_C4 = parse_architecture_safe(compact_layout(4, magic_states="all_sides"))
+TEST_MAPPING = Mapping(
+    map={"0": 6, "1": 16, "2": 8, "3": 18},
+    arch=TEST_ARCH_C4,
+    gates=[[0, 1], [2, 3], [1, 2], [0], [3], [0, 3], [1]],
+)
+
+
+def test_route_in_threads() -> None:
+    """
+    Several threads route mappings on the same architecture at once. Each
+    routing routes every gate, and greedy routings, which do not draw
+    random numbers, match the ones routed one after another.
+    """
+    rng = random.Random(5)
+    mappings = [random_circuit_mapping(rng, 16, 150) for _ in range(6)]
+    dascot = Dascot(1, 60)
+    expected = [dascot.route(mapping, greedy=True) for mapping in mappings]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        greedy = list(pool.map(lambda m: dascot.route(m, greedy=True), mappings))
+        full = list(pool.map(dascot.route, mappings))
+    assert greedy == expected
+    for mapping, routing in zip(mappings, full, strict=True):
+        assert not routing.timed_out
+        assert sorted(route.id for step in routing.steps for route in step) == list(
+            range(len(mapping.gates))
+        )
+
+
+def test_route_timeout() -> None:
+    """
+    With no time left the routing comes back partial and flagged.
+    """
+    partial = Dascot(1, 1e-9).route(TEST_MAPPING)
+    assert partial.timed_out
+    assert partial.steps == []
+
+
+def test_zero_timeout() -> None:
+    """
+    A routing timeout of 0 sets no time limit, so every gate is routed,
+    while a mapping timeout of 0 stops the chain before its first step.
+    """
+    dascot = Dascot(0, 0)
+    mapping = random_circuit_mapping(random.Random(6), 16, 150)
+    map_dict, _, stats = _map_chain(
+        extract_qubits_from_gates(mapping.gates),
+        mapping.gates,
+        mapping.arch.__dict__,
+        dascot.anneal_params(mapping.gates),
+        dascot.map_timeout_sec,
+        0,
+    )
+    assert stats.stop_reason == "timeout"
+    assert stats.steps == 0
+    assert set(map_dict) == set(range(16))
+    routing = dascot.route(TEST_MAPPING)
+    assert not routing.timed_out
+    assert sum(len(step) for step in routing.steps) == len(TEST_MAPPING.gates)
+
+
+def test_map_empty_circuit() -> None:
+    """
+    A circuit without gates maps to an empty mapping that routes in no steps.
+    """
+    dascot = Dascot(1, 1)
+    mapping = dascot.map(Circuit(arch=TEST_ARCH_C4, gates=[]))
+    assert mapping.map == {}
+    routing = dascot.route(mapping)
+    assert not routing.timed_out
+    assert routing.steps == []
+
+
+def test_route_many_reproducible() -> None:
+    """
+    Routings from route_many depend only on their seeds, not on the
+    number of workers, and every run is reported in seed order.
+    """
+    dascot = Dascot(1, 60)
+    runs = dascot.route_many(TEST_MAPPING, 3, workers=1, seeds=[7, 8, 9])
+    again = dascot.route_many(TEST_MAPPING, 3, workers=2, seeds=[7, 8, 9])
+    assert [run.seed for run in runs] == [7, 8, 9]
+    assert [run.routing for run in runs] == [run.routing for run in again]
+    assert all(not run.routing.timed_out and run.elapsed_sec > 0 for run in runs)
+
+
+def test_rank_mappings() -> None:
+    """
+    Ranked mappings come back from fewest to most overlaps, each with the
+    overlap count of its own mapping and its position in the batch.
+    """
+    dascot = Dascot(1, 60)
+    mappings = [
+        Mapping(
+            map=dict(zip("0123", cells, strict=True)),
+            arch=TEST_ARCH_C4,
+            gates=TEST_MAPPING.gates,
+        )
+        for cells in itertools.permutations(TEST_ARCH_C4.alg_qubits)
+    ]
+    ranked = dascot.rank_mappings(mappings)
+    assert sorted(m.index for m in ranked) == list(range(len(mappings)))
+    assert [m.overlaps for m in ranked] == sorted(m.overlaps for m in ranked)
+    for scored in ranked:
+        assert scored.mapping is mappings[scored.index]
+        single = dascot.rank_mappings([scored.mapping])
+        assert single[0].overlaps == scored.overlaps
+    assert dascot.rank_mappings([]) == []
+
+
+def seeded(call, *args, **kwargs):
+    random.seed(0)
+    np.random.seed(0)
+    return call(*args, **kwargs)
+
+
+def test_profile_gives_same_results() -> None:
+    """
+    Mapping and routing with a circuit profile, also after a pickle round
+    trip, give the same results as preprocessing the circuit on every call.
+    """
+    dascot = Dascot(10, 60)
+    profile = dascot.profile(TEST_MAPPING.gates)
+    assert profile.depth == 3
+    assert profile.anneal_params == dascot.anneal_params(TEST_MAPPING.gates)
+    for shared in (profile, pickle.loads(pickle.dumps(profile))):
+        circuit = Circuit(arch=TEST_ARCH_C4, gates=TEST_MAPPING.gates)
+        assert seeded(dascot.map, circuit) == seeded(
+            dascot.map, circuit, profile=shared
+        )
+        assert seeded(dascot.bootstrapped_map, TEST_MAPPING) == seeded(
+            dascot.bootstrapped_map, TEST_MAPPING, profile=shared
+        )
+        for greedy in (False, True):
+            assert seeded(dascot.route, TEST_MAPPING, greedy) == seeded(
+                dascot.route, TEST_MAPPING, greedy, shared
+            )
+
+
+def untimed(chain: MappingChain) -> MappingChain:
+    return replace(chain, stats=replace(chain.stats, elapsed_sec=0.0))
+
+
+def test_profile_empty_circuit() -> None:
+    """
+    An empty circuit has a zero profile that map and route accept.
+    """
+    dascot = Dascot(1, 1)
+    profile = dascot.profile([])
+    assert profile.num_gates == 0
+    assert profile.depth == 0
+    assert profile.qubits == set()
+    assert profile.phased_graph.num_qubits == 0
+    mapping = dascot.map(Circuit(arch=TEST_ARCH_C4, gates=[]), profile=profile)
+    assert mapping.map == {}
+    assert dascot.route(mapping, profile=profile).steps == []
+
+
+def test_map_parallel_reproducible() -> None:
+    """
+    In both modes the chains of map_parallel depend only on their seeds,
+    not on the number of workers, the best chain's mapping is returned and
+    every chain reports why it stopped.
+    """
+    mapping = random_circuit_mapping(random.Random(7), 8, 40)
+    circuit = Circuit(arch=mapping.arch, gates=mapping.gates)
+    dascot = Dascot(60, 60)
+    for tempering in (False, True):
+        runs = [
+            dascot.map_parallel(
+                circuit, 3, workers=workers, seeds=[1, 2, 3], tempering=tempering
+            )
+            for workers in (1, 2)
+        ]
+        assert runs[0].mapping == runs[1].mapping
+        assert [untimed(chain) for chain in runs[0].chains] == [
+            untimed(chain) for chain in runs[1].chains
+        ]
+        chains = runs[0].chains
+        assert [chain.seed for chain in chains] == [1, 2, 3]
+        assert all(chain.stats.stop_reason for chain in chains)
+        assert min(chain.overlaps for chain in chains) == min(
+            ranked.overlaps for ranked in dascot.rank_mappings([runs[0].mapping])
+        )
+    temperatures = [chain.temperature for chain in chains]
+    assert temperatures == sorted(temperatures, reverse=True)
+
+
+def test_map_parallel_options() -> None:
+    """
+    Independent chains honour the schedule and surrogate timeout like `map`,
+    while tempering, which anneals at fixed temperatures, rejects them.
+    """
+    mapping = random_circuit_mapping(random.Random(7), 8, 40)
+    circuit = Circuit(arch=mapping.arch, gates=mapping.gates)
+    for dascot in (
+        Dascot(60, 60, schedule=ReheatingSchedule),
+        Dascot(60, 60, surrogate_timeout_sec=60),
+    ):
+        run = dascot.map_parallel(circuit, 1, workers=1, seeds=[0])
+        assert run.mapping == seeded(dascot.map, circuit)
+        with pytest.raises(ValueError):
+            dascot.map_parallel(circuit, 2, workers=1, tempering=True)
+
+
+class FixedRandom(random.Random):
+    def random(self) -> float:
+        return 0.5
+
+
+def test_exchange_replicas() -> None:
+    """
+    A colder replica always takes a lower energy state from its hotter
+    neighbour and rarely gives one away. Only the pairs starting at the
+    offset are considered.
+    """
+    states, energies = ["hot", "cold"], [1, 5]
+    _exchange_replicas(states, energies, [10, 1], 0, FixedRandom())
+    assert states == ["cold", "hot"] and energies == [5, 1]
+    _exchange_replicas(states, energies, [10, 1], 0, FixedRandom())
+    assert states == ["cold", "hot"] and energies == [5, 1]
+    states, energies = ["a", "b", "c"], [1, 1, 5]
+    _exchange_replicas(states, energies, [100, 10, 1], 1, FixedRandom())
+    assert states == ["a", "c", "b"] and energies == [1, 5, 1]
@@ -0,0 +1,66 @@
+import random
+
+from similarity_mapping.dascot.architecture import compact_layout
+from similarity_mapping.dascot.phased_graph import build_random_map
+from similarity_mapping.types import Mapping, parse_architecture_safe
+
+# Small circuit of CNOTs and T gates shared by the annealing tests
+TEST_GATES = [
+    [0, 4],
+    [1],
+    [2, 5],
+    [3, 1],
+    [6],
+    [0, 2],
+    [5, 6],
+    [4],
+    [1, 6],
+    [3, 0],
+    [2],
+    [4, 5],
+    [6, 3],
+    [1, 2],
+]
+TEST_QUBITS = {q for gate in TEST_GATES for q in gate}
+TEST_ARCH = compact_layout(len(TEST_QUBITS), magic_states="all_sides")
+
+
+def random_gates(
+    rng: random.Random, num_qubits: int, num_gates: int, cnot_fraction: float = 0.6
+) -> list[list[int]]:
+    """
+    Random CNOTs, a `cnot_fraction` of the gates, and T gates on
+    `num_qubits` qubits.
+    """
+    return [
+        (
+            rng.sample(range(num_qubits), 2)
+            if num_qubits > 1 and rng.random() < cnot_fraction
+            else [rng.randrange(num_qubits)]
+        )
+        for _ in range(num_gates)
+    ]
+
+
+def random_mapping(seed: int) -> dict:
+    """
+    Random mapping of TEST_QUBITS onto TEST_ARCH, as (x, y) coordinates.
+    """
+    random.seed(seed)
+    grid_len = TEST_ARCH["width"]
+    return {
+        q: (p % grid_len, p // grid_len)
+        for q, p in build_random_map(TEST_QUBITS, TEST_ARCH)
+    }
+
+
+def random_circuit_mapping(
+    rng: random.Random, num_qubits: int, num_gates: int
+) -> Mapping:
+    """
+    Random circuit randomly mapped onto a compact layout of its qubits.
+    """
+    arch = parse_architecture_safe(compact_layout(num_qubits, magic_states="all_sides"))
+    gates = random_gates(rng, num_qubits, num_gates, cnot_fraction=0.7)
+    cells = rng.sample(arch.alg_qubits, num_qubits)
+    return Mapping(map={str(q): c for q, c in enumerate(cells)}, arch=arch, gates=gates)
@@ -1,5 +1,6 @@
 from dataclasses import replace
 from copy import deepcopy
+import random
 
 from similarity_mapping.types import (
     Mapping,
@@ -7,8 +8,12 @@ from similarity_mapping.types import (
     Architecture,
     parse_architecture_safe,
 )
-from similarity_mapping.similarity_map import SimilarityMapper
-from similarity_mapping.dascot.architecture import compact_layout, square_sparse_layout
+from similarity_mapping.similarity_map import FreeLocations, SimilarityMapper
+from similarity_mapping.dascot.architecture import (
+    compact_layout,
+    geometry_for_arch,
+    square_sparse_layout,
+)
 
 TEST_ARCH_C4 = parse_architecture_safe(compact_layout(4, magic_states="all_sides"))
 """
@@ -200,3 +205,49 @@ def test_soft_map_different_arch():
     assert qubits == set(soft_mapping.map.keys())
     # Ensure that the soft map only uses locations in the circuit architecture
     assert set(soft_mapping.map.values()) <= set(test_circuit.arch.alg_qubits)
+
+
+def test_free_locations_nearest() -> None:
+    """
+    The index hands out the free location nearest to each query point by
+    Euclidean distance, ties going to the location listed first, including
+    for query points outside the architecture.
+    """
+    rng = random.Random(0)
+    geometry = geometry_for_arch(TEST_ARCH_S9)
+    locations = rng.sample(TEST_ARCH_S9.alg_qubits, len(TEST_ARCH_S9.alg_qubits))
+    free = FreeLocations(geometry, locations)
+    remaining = list(locations)
+
+    def key(location: int, x: int, y: int) -> tuple[int, int]:
+        lx, ly = geometry.coords(location)
+        return (lx - x) ** 2 + (ly - y) ** 2, locations.index(location)
+
+    while remaining:
+        x, y = rng.randint(-2, 11), rng.randint(-2, 11)
+        expected = min(remaining, key=lambda location: key(location, x, y))
+        assert free.pop_nearest(x, y) == expected
+        remaining.remove(expected)
+    assert len(free) == 0
+
+
+def test_hard_map_large_layout() -> None:
+    """
+    Hard mapping a compact mapping onto a large sparse layout gives every
+    qubit a distinct location of that layout.
+    """
+    arch = parse_architecture_safe(square_sparse_layout(1024, magic_states="all_sides"))
+    similar_arch = parse_architecture_safe(
+        compact_layout(1024, magic_states="all_sides")
+    )
+    test_gates = [[q, q + 1] for q in range(0, 1024, 2)]
+    test_map = {str(q): c for q, c in enumerate(similar_arch.alg_qubits)}
+    mapper = SimilarityMapper(
+        Circuit(arch=arch, gates=test_gates),
+        Mapping(map=test_map, arch=similar_arch, gates=[]),
+    )
+    hard_mapping = mapper.hard_map()
+    assert hard_mapping is not None
+    assert set(hard_mapping.map) == set(test_map)
+    assert len(set(hard_mapping.map.values())) == len(test_map)
+    assert set(hard_mapping.map.values()) <= set(arch.alg_qubits)